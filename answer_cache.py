@@ -0,0 +1,159 @@
+"""
+Caché semántica de respuestas del Asistente IA.
+
+Los analistas repiten las mismas preguntas ("¿Cuáles son los riesgos más
+críticos?") y cada una costaba un embedding, una búsqueda vectorial y una
+llamada a `generate_content`. Aquí las respuestas se guardan con el embedding
+de la consulta: una pregunta igual (tras normalizar mayúsculas, acentos y
+signos) se resuelve sin ninguna llamada a Gemini, y una casi igual (similitud
+coseno >= umbral) con solo el embedding de la consulta, normalmente cacheado.
+
+Cada entrada lleva la versión de los datos (`data_access.version_datos`) con
+la que se generó: al insertar riesgos o vectores la caché se vacía, y además
+las entradas caducan por tiempo (escrituras desde otros procesos).
+
+Las respuestas a turnos de seguimiento dependen de la conversación previa
+("¿Y los altos?"): se guardan y buscan con `clave_contexto(historial)`, de modo
+que solo se reutilizan ante la misma pregunta con el mismo historial.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+UMBRAL_SIMILITUD = float(os.getenv("ANSWER_CACHE_UMBRAL", "0.95"))
+TTL_RESPUESTAS = int(os.getenv("ANSWER_CACHE_TTL", "1800"))
+MAX_RESPUESTAS = int(os.getenv("ANSWER_CACHE_MAX", "256"))
+
+
+def normalizar_consulta(texto):
+    """Minúsculas, sin acentos, sin signos de puntuación y con espacios colapsados"""
+    texto = "".join(c for c in unicodedata.normalize("NFKD", (texto or "").lower()) if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in texto).split())
+
+
+def clave_contexto(historial):
+    """Hash del historial de la conversación ("" sin historial)"""
+    if not historial:
+        return ""
+    return hashlib.sha1(historial.encode("utf-8")).hexdigest()
+
+
+def _unitario(embedding):
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norma = np.linalg.norm(vector)
+    return vector / norma if norma > 0 else vector
+
+
+class CacheRespuestas:
+    """Respuestas por consulta exacta o por similitud de embedding, ligadas a una versión de datos"""
+
+    def __init__(self, umbral=UMBRAL_SIMILITUD, ttl_segundos=TTL_RESPUESTAS, max_entradas=MAX_RESPUESTAS,
+                 dimension=768):
+        self.umbral = umbral
+        self.dimension = dimension
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self.hits_exactos = 0
+        self.hits_semanticos = 0
+        self.misses = 0
+        self.invalidaciones = 0
+        self._entradas = []  # De la más antigua a la más reciente
+        self._matrices = {}  # contexto -> (entradas, matriz de embeddings); se reconstruyen al cambiar
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _depurar(self, version):
+        """Vacía la caché si cambió la versión de los datos y quita las entradas caducadas"""
+        if version != self._version:
+            if self._entradas:
+                self.invalidaciones += 1
+            self._entradas, self._matrices = [], {}
+            self._version = version
+            return
+        ahora = time.monotonic()
+        vigentes = [e for e in self._entradas if e["expira"] > ahora]
+        if len(vigentes) != len(self._entradas):
+            self._entradas, self._matrices = vigentes, {}
+
+    def _vector(self, embedding):
+        """Embedding normalizado; None si no es del modelo (p. ej. el fallback por hash)"""
+        vector = _unitario(embedding)
+        return vector if vector.shape[0] == self.dimension else None
+
+    def _acierto(self, entrada, similitud):
+        return {"respuesta": entrada["respuesta"], "consulta": entrada["consulta"], "similitud": similitud}
+
+    def buscar(self, consulta, version, embedding=None, contexto=""):
+        """
+        Respuesta cacheada para `consulta` o None. Sin `embedding` solo se
+        busca la consulta normalizada; con él, también la más similar que
+        supere el umbral. Solo se consideran las entradas con el mismo
+        `contexto` (ver clave_contexto). Retorna dict con respuesta, consulta
+        original y similitud.
+        """
+        clave = normalizar_consulta(consulta)
+        with self._lock:
+            self._depurar(version)
+            for entrada in reversed(self._entradas):
+                if entrada["clave"] == clave and entrada["contexto"] == contexto:
+                    self.hits_exactos += 1
+                    return self._acierto(entrada, 1.0)
+            if embedding is None:
+                return None
+
+            query = self._vector(embedding)
+            if contexto not in self._matrices:
+                candidatas = [e for e in self._entradas if e["vector"] is not None and e["contexto"] == contexto]
+                matriz = np.vstack([e["vector"] for e in candidatas]) if candidatas else None
+                self._matrices[contexto] = (candidatas, matriz)
+            candidatas, matriz = self._matrices[contexto]
+            if query is not None and candidatas:
+                similitudes = matriz @ query
+                mejor = int(np.argmax(similitudes))
+                if similitudes[mejor] >= self.umbral:
+                    self.hits_semanticos += 1
+                    return self._acierto(candidatas[mejor], float(similitudes[mejor]))
+            self.misses += 1
+            return None
+
+    def guardar(self, consulta, embedding, respuesta, version, contexto=""):
+        """Guarda una respuesta generada con los datos de `version` (y el historial `contexto`)"""
+        if not respuesta or embedding is None:
+            return
+        with self._lock:
+            self._depurar(version)
+            self._entradas.append({
+                "clave": normalizar_consulta(consulta),
+                "consulta": consulta,
+                "vector": self._vector(embedding),
+                "respuesta": respuesta,
+                "contexto": contexto,
+                "expira": time.monotonic() + self.ttl_segundos
+            })
+            if len(self._entradas) > self.max_entradas:
+                self._entradas = self._entradas[-self.max_entradas:]
+            self._matrices = {}
+
+    def estadisticas(self):
+        with self._lock:
+            entradas = len(self._entradas)
+        hits = self.hits_exactos + self.hits_semanticos
+        total = hits + self.misses
+        return {
+            "entradas": entradas,
+            "max_entradas": self.max_entradas,
+            "umbral": self.umbral,
+            "hits_exactos": self.hits_exactos,
+            "hits_semanticos": self.hits_semanticos,
+            "misses": self.misses,
+            "hit_rate": (hits / total) if total else 0.0,
+            "invalidaciones": self.invalidaciones
+        }
@@ -0,0 +1,123 @@
+"""
+Índice léxico BM25 en proceso y fusión por rango recíproco (RRF).
+
+Los embeddings densos ordenan mal los términos exactos del dominio: nombres de
+activos ("VPN corporativa"), identificadores de controles ISO ("A.8") y siglas
+("MFA", "CSRF"). `IndiceBM25` mantiene un índice invertido sobre los textos de
+los chunks (se actualiza junto con `LocalVectorStore`) y `fusion_rrf` combina
+sus resultados con los de la búsqueda vectorial sin tener que calibrar escalas
+de score distintas.
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+K1 = 1.5
+B = 0.75
+K_RRF = 60
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a al algo ante como con contra cual cuando de del desde donde el ella ellas ellos en entre era es esa ese
+eso esta este esto estos hay la las le les lo los mas me mi muy no nos o otra otro para pero por que quien
+se sea ser si sin sobre su sus tambien te tiene tu un una uno unos y ya
+an and are as at be by for from has have in is it its of on or that the this to was were which with
+""".split())
+
+
+def _sin_acentos(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """
+    Términos en minúsculas y sin acentos. Los identificadores con puntos se
+    indexan también por sus prefijos ("a.8.2" -> "a.8.2", "a.8") para que una
+    consulta por "A.8" encuentre sus subcontroles.
+    """
+    terminos = []
+    for token in _TOKEN.findall(_sin_acentos((texto or "").lower())):
+        if token in STOPWORDS:
+            continue
+        terminos.append(token)
+        if "." in token:
+            partes = token.split(".")
+            terminos.extend(".".join(partes[:i]) for i in range(2, len(partes)))
+    return terminos
+
+
+class IndiceBM25:
+    """Índice invertido incremental; los ids de documento son posiciones 0..n-1"""
+
+    def __init__(self, k1=K1, b=B):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # término -> ([ids], [frecuencias])
+        self._longitudes = []
+        self._total_longitud = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._longitudes)
+
+    def agregar(self, textos):
+        """Indexa textos nuevos a continuación de los existentes"""
+        with self._lock:
+            for texto in textos:
+                doc_id = len(self._longitudes)
+                terminos = tokenizar(texto)
+                for termino, frecuencia in Counter(terminos).items():
+                    ids, frecuencias = self._postings.setdefault(termino, ([], []))
+                    ids.append(doc_id)
+                    frecuencias.append(frecuencia)
+                self._longitudes.append(len(terminos))
+                self._total_longitud += len(terminos)
+
+    def buscar(self, consulta, k=5):
+        """Top-k (doc_id, score) para la consulta; vacío si ningún término aparece"""
+        terminos = set(tokenizar(consulta))
+        with self._lock:
+            n = len(self._longitudes)
+            if n == 0 or not terminos or k <= 0:
+                return []
+            longitudes = np.asarray(self._longitudes, dtype=np.float32)
+            promedio = self._total_longitud / n or 1.0
+            postings = [self._postings[t] for t in terminos if t in self._postings]
+
+        scores = np.zeros(n, dtype=np.float32)
+        normalizacion = self.k1 * (1 - self.b + self.b * longitudes / promedio)
+        for ids, frecuencias in postings:
+            ids = np.asarray(ids)
+            tf = np.asarray(frecuencias, dtype=np.float32)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + normalizacion[ids])
+
+        candidatos = np.flatnonzero(scores)
+        if candidatos.size == 0:
+            return []
+        if candidatos.size > k:
+            candidatos = candidatos[np.argpartition(-scores[candidatos], k - 1)[:k]]
+        candidatos = candidatos[np.argsort(-scores[candidatos])]
+        return [(int(i), float(scores[i])) for i in candidatos]
+
+
+def fusion_rrf(listas, k=5, k_rrf=K_RRF, clave=lambda r: r["texto"]):
+    """
+    Fusión por rango recíproco: cada resultado suma 1 / (k_rrf + rango) por cada
+    lista en la que aparece. Retorna los k mejores con su score RRF en `score`
+    y los scores originales en `scores_origen`.
+    """
+    fusion = {}
+    for nombre, resultados in listas.items():
+        for rango, resultado in enumerate(resultados, start=1):
+            c = clave(resultado)
+            if c not in fusion:
+                fusion[c] = {**resultado, "score": 0.0, "scores_origen": {}}
+            fusion[c]["score"] += 1.0 / (k_rrf + rango)
+            fusion[c]["scores_origen"][nombre] = resultado.get("score")
+    return sorted(fusion.values(), key=lambda r: r["score"], reverse=True)[:k]
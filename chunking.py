@@ -0,0 +1,145 @@
+"""
+División de textos en chunks para el sistema RAG.
+
+Compartido por la aplicación (riesgos, textos cargados) y por la ingesta de
+documentos de `docs_infosec/` (ver `ingest_docs.py`).
+
+En lugar de cortar cada N caracteres, el texto se separa en bloques naturales
+(campos "Clave: valor" de los registros de riesgo, párrafos y encabezados de
+cláusulas tipo ISO "5.1 Liderazgo", "A.8.2 ...", "Anexo A") y los bloques se
+agrupan hasta un presupuesto de tokens. Un encabezado abre un chunk nuevo
+(junto con los encabezados que lo siguen); solo los bloques que exceden el
+presupuesto se parten por oraciones.
+`iterar_trozos` es un generador: los documentos grandes se procesan sin
+materializar todos sus chunks.
+"""
+
+import re
+
+CARACTERES_POR_TOKEN = 4  # Aproximación para español/inglés técnico
+TOKENS_POR_CHUNK = 200
+TOKENS_RIESGO = 256  # Un registro de riesgo completo cabe en un solo chunk
+TOKENS_DOCUMENTO = 320  # Normas y guías (docs_infosec)
+MIN_TOKENS = 8  # Evitar chunks muy pequeños (~30 caracteres)
+
+_ENCABEZADO = re.compile(
+    r"^(?:(?:[A-Z]\.)?\d+(?:\.\d+)*\.?\s+[A-ZÁÉÍÓÚÑ]"
+    r"|(?i:cl[áa]usula|anexo|annex|secci[óo]n|section|cap[íi]tulo|chapter)\b)"
+)
+_CAMPO = re.compile(r"^[^\W\d_][\w ()/-]{0,40}:\s")
+_FIN_ORACION = re.compile(r"(?<=[.!?;])\s+")
+
+
+def estimar_tokens(texto):
+    """Número aproximado de tokens de un texto"""
+    return max(1, -(-len(texto) // CARACTERES_POR_TOKEN))
+
+
+def _es_encabezado(linea):
+    return len(linea) <= 80 and not linea.endswith(".") and bool(_ENCABEZADO.match(linea))
+
+
+def _bloques(texto):
+    """Genera (es_encabezado, bloque): encabezados, campos y párrafos"""
+    parrafo = []
+    for linea in texto.splitlines():
+        linea = " ".join(linea.split())
+        if not linea:
+            if parrafo:
+                yield False, " ".join(parrafo)
+                parrafo = []
+            continue
+
+        encabezado = _es_encabezado(linea)
+        if encabezado or _CAMPO.match(linea):
+            if parrafo:
+                yield False, " ".join(parrafo)
+                parrafo = []
+            if encabezado:
+                yield True, linea
+                continue
+        parrafo.append(linea)
+
+    if parrafo:
+        yield False, " ".join(parrafo)
+
+
+def _partir(bloque, max_tokens):
+    """
+    Parte un bloque mayor al presupuesto por oraciones, por palabras si hace
+    falta y, para una palabra mayor al presupuesto (URL, hash, base64), en
+    tramos que completan cada trozo hasta el presupuesto
+    """
+    max_caracteres = max_tokens * CARACTERES_POR_TOKEN
+    for oracion in _FIN_ORACION.split(bloque):
+        if len(oracion) <= max_caracteres:
+            yield oracion
+            continue
+        actual, largo = [], 0
+        for palabra in oracion.split(" "):
+            while palabra:
+                espacio = max_caracteres - largo - (1 if actual else 0)
+                if len(palabra) <= espacio:
+                    actual.append(palabra)
+                    largo += len(palabra) + (1 if len(actual) > 1 else 0)
+                    break
+                if len(palabra) > max_caracteres and espacio > 0:
+                    actual.append(palabra[:espacio])
+                    palabra = palabra[espacio:]
+                yield " ".join(actual)
+                actual, largo = [], 0
+        if actual:
+            yield " ".join(actual)
+
+
+def iterar_trozos(texto, max_tokens=TOKENS_POR_CHUNK, solapamiento_tokens=0, min_tokens=MIN_TOKENS):
+    """
+    Generador de chunks de hasta `max_tokens` respetando los límites naturales
+    del texto. Con `solapamiento_tokens` > 0 el chunk siguiente repite los
+    últimos bloques del anterior (solo cuando el corte es por presupuesto).
+    """
+    if not texto:
+        return
+
+    actual, tokens = [], 0
+    con_contenido = False  # Encabezados consecutivos se quedan juntos
+
+    def emitir():
+        chunk = "\n".join(actual)
+        return chunk if estimar_tokens(chunk) >= min_tokens else None
+
+    for encabezado, bloque in _bloques(texto):
+        partes = [bloque] if estimar_tokens(bloque) <= max_tokens else list(_partir(bloque, max_tokens))
+        for parte in partes:
+            tokens_parte = estimar_tokens(parte)
+            if actual and ((encabezado and con_contenido) or tokens + tokens_parte > max_tokens):
+                chunk = emitir()
+                if chunk:
+                    yield chunk
+
+                # Solapamiento: arrastrar los últimos bloques dentro del presupuesto
+                arrastre, tokens_arrastre = [], 0
+                if not encabezado and solapamiento_tokens > 0:
+                    for previo in reversed(actual):
+                        tokens_previo = estimar_tokens(previo)
+                        if tokens_arrastre + tokens_previo > solapamiento_tokens:
+                            break
+                        arrastre.insert(0, previo)
+                        tokens_arrastre += tokens_previo
+                actual, tokens = arrastre, tokens_arrastre
+                con_contenido = bool(arrastre)
+
+            actual.append(parte)
+            tokens += tokens_parte
+            con_contenido = con_contenido or not encabezado
+            encabezado = False
+
+    if actual:
+        chunk = emitir()
+        if chunk:
+            yield chunk
+
+
+def dividir_en_trozos(texto, max_tokens=TOKENS_POR_CHUNK, solapamiento_tokens=0):
+    """Lista de chunks de `texto` (ver iterar_trozos)"""
+    return list(iterar_trozos(texto, max_tokens, solapamiento_tokens))
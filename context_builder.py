@@ -0,0 +1,136 @@
+"""
+Construcción concurrente del contexto RAG del asistente.
+
+Cada componente del contexto (estadísticas, muestra de riesgos, embedding de la
+consulta + búsqueda vectorial) es una llamada bloqueante a MongoDB o Gemini.
+Aquí se lanzan todas a la vez desde asyncio sobre un pool de hilos propio, cada
+una con su propio presupuesto de tiempo: si un componente se demora o falla se
+usa su valor por defecto y la respuesta se genera con el resto del contexto.
+
+Un hilo de Python no se puede interrumpir: el componente que agota su tiempo
+sigue ocupando un hilo del pool hasta terminar. Cuando se acumulan
+`MAX_COLGADOS` de esos hilos el pool se reemplaza por uno nuevo (el anterior se
+cierra sin esperar), así un servicio colgado no deja sin hilos a las consultas
+siguientes.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Presupuesto de tiempo por componente (segundos)
+TIMEOUTS_DEFECTO = {
+    "metricas": float(os.getenv("CONTEXTO_TIMEOUT_METRICAS", "2.0")),
+    "muestra": float(os.getenv("CONTEXTO_TIMEOUT_MUESTRA", "2.0")),
+    "vectorial": float(os.getenv("CONTEXTO_TIMEOUT_VECTORIAL", "4.0")),
+}
+TIMEOUT_GENERICO = 3.0
+MAX_HILOS = 8
+MAX_COLGADOS = MAX_HILOS // 2  # Hilos ocupados por componentes vencidos antes de renovar el pool
+
+# Pool propio: asyncio.run() espera al executor por defecto al cerrar el loop,
+# lo que anularía los timeouts si un componente se queda colgado
+_executor = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="contexto-rag")
+_colgados = 0  # Componentes vencidos que aún ocupan un hilo de `_executor`
+_lock = threading.Lock()
+
+# Hilos que solo corren loops de asyncio (esperan a `_executor`, no comparten sus hilos)
+_coordinador = ThreadPoolExecutor(max_workers=4, thread_name_prefix="contexto-loop")
+
+
+def _pool():
+    """Pool de componentes vigente; se renueva si está saturado de hilos colgados"""
+    global _executor, _colgados
+    with _lock:
+        if _colgados >= MAX_COLGADOS:
+            print(f"Contexto RAG: {_colgados} componentes colgados, se renueva el pool de hilos")
+            _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="contexto-rag")
+            _colgados = 0
+        return _executor
+
+
+def _registrar_colgado(pool, futuro):
+    """Cuenta el hilo de un componente vencido hasta que termine"""
+    global _colgados
+
+    def liberar(_):
+        global _colgados
+        with _lock:
+            if pool is _executor:
+                _colgados -= 1
+
+    with _lock:
+        if pool is not _executor:
+            return
+        _colgados += 1
+    futuro.add_done_callback(liberar)
+
+
+def iniciar(funcion, *args):
+    """Lanza `funcion(*args)` en el pool de componentes y retorna su Future"""
+    return _pool().submit(funcion, *args)
+
+
+class Componente:
+    """Paso del contexto: función bloqueante, presupuesto y valor de respaldo"""
+
+    def __init__(self, funcion, timeout=None, defecto=None):
+        self.funcion = funcion
+        self.timeout = timeout
+        self.defecto = defecto
+
+
+async def _ejecutar(nombre, componente, diagnostico):
+    loop = asyncio.get_running_loop()
+    timeout = componente.timeout or TIMEOUTS_DEFECTO.get(nombre, TIMEOUT_GENERICO)
+    inicio = time.perf_counter()
+    pool = _pool()
+    futuro = pool.submit(componente.funcion)
+    try:
+        valor = await asyncio.wait_for(asyncio.wrap_future(futuro, loop=loop), timeout)
+        estado = "ok"
+    except asyncio.TimeoutError:
+        # wait_for cancela el Future si aún no empezó; si ya corre, su hilo queda ocupado
+        if not futuro.done():
+            _registrar_colgado(pool, futuro)
+        valor, estado = componente.defecto, "timeout"
+    except Exception as e:
+        valor, estado = componente.defecto, f"error: {e}"
+    diagnostico[nombre] = {"estado": estado, "segundos": time.perf_counter() - inicio}
+    return nombre, valor
+
+
+async def construir_contexto_async(componentes):
+    """Ejecuta los componentes en paralelo; retorna (resultados, diagnostico)"""
+    diagnostico = {}
+    pares = await asyncio.gather(*(
+        _ejecutar(nombre, componente, diagnostico) for nombre, componente in componentes.items()
+    ))
+    return dict(pares), diagnostico
+
+
+def construir_contexto(componentes):
+    """
+    Versión síncrona para el script de Streamlit (que no tiene un loop activo).
+
+    `componentes` es un dict nombre -> Componente. Retorna (resultados,
+    diagnostico) donde diagnostico indica estado y duración de cada paso.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(construir_contexto_async(componentes))
+
+    # Ya hay un loop en este hilo: se ejecuta en un hilo aparte
+    return construir_contexto_en_paralelo(componentes).result()
+
+
+def construir_contexto_en_paralelo(componentes):
+    """
+    Como `construir_contexto`, pero sin bloquear: retorna un Future con
+    (resultados, diagnostico) para solapar la construcción con otro trabajo
+    """
+    return _coordinador.submit(asyncio.run, construir_contexto_async(componentes))
@@ -0,0 +1,100 @@
+"""
+Memoria acotada de la conversación del Asistente IA.
+
+El historial del chat crecía sin límite en `st.session_state` (y se volvía a
+pintar completo en cada rerun), mientras que al modelo solo le llegaba el
+último mensaje. `MemoriaConversacion` conserva literalmente los últimos
+`turnos_literales` turnos y pliega los anteriores en un resumen acumulado de
+como máximo `tokens_resumen` tokens (extractivo, sin llamadas al modelo: la
+pregunta y la primera oración de cada respuesta). Tanto la memoria de la
+sesión como el contexto que se envía al modelo quedan acotados.
+"""
+
+import os
+import re
+
+from chunking import estimar_tokens
+from prompt_packer import recortar
+
+TURNOS_LITERALES = int(os.getenv("CHAT_TURNOS_LITERALES", "3"))
+TOKENS_RESUMEN_CONVERSACION = int(os.getenv("CHAT_TOKENS_RESUMEN", "400"))
+TOKENS_POR_MENSAJE = 300  # Máximo de cada mensaje literal dentro del prompt
+_PRIMERA_ORACION = re.compile(r"^(.+?[.!?])(?:\s|$)", re.S)
+
+
+def _primera_oracion(texto, max_caracteres=160):
+    texto = " ".join(re.sub(r"[*_#`|>]", " ", texto or "").split())
+    coincidencia = _PRIMERA_ORACION.match(texto)
+    oracion = coincidencia.group(1) if coincidencia else texto
+    return oracion if len(oracion) <= max_caracteres else oracion[:max_caracteres].rsplit(" ", 1)[0] + "…"
+
+
+class MemoriaConversacion:
+    """Últimos turnos literales + resumen acumulado de los anteriores"""
+
+    def __init__(self, turnos_literales=TURNOS_LITERALES, tokens_resumen=TOKENS_RESUMEN_CONVERSACION):
+        self.turnos_literales = turnos_literales
+        self.tokens_resumen = tokens_resumen
+        self.mensajes = []  # Mensajes literales: {"role", "content", ...}
+        self.lineas_resumen = []
+        self.turnos_resumidos = 0
+        self.turnos_descartados = 0  # Plegados pero ya fuera del presupuesto del resumen
+
+    def __len__(self):
+        return len(self.mensajes)
+
+    def __iter__(self):
+        return iter(self.mensajes)
+
+    @property
+    def resumen(self):
+        if not self.lineas_resumen:
+            return ""
+        prefijo = f"(+{self.turnos_descartados} turnos anteriores)\n" if self.turnos_descartados else ""
+        return prefijo + "\n".join(self.lineas_resumen)
+
+    def agregar(self, rol, contenido, **extra):
+        """Agrega un mensaje; al superar los turnos literales, pliega los más antiguos"""
+        self.mensajes.append({"role": rol, "content": contenido, **extra})
+        while self._turnos() > self.turnos_literales:
+            self._plegar_turno()
+
+    def _turnos(self):
+        return sum(1 for m in self.mensajes if m["role"] == "user")
+
+    def _plegar_turno(self):
+        """Mueve el turno más antiguo (pregunta y respuestas) al resumen"""
+        fin = 1
+        while fin < len(self.mensajes) and self.mensajes[fin]["role"] != "user":
+            fin += 1
+        turno, self.mensajes = self.mensajes[:fin], self.mensajes[fin:]
+
+        pregunta = next((m["content"] for m in turno if m["role"] == "user"), "")
+        respuesta = next((m["content"] for m in turno if m["role"] == "assistant"), "")
+        linea = f"- P: {_primera_oracion(pregunta, 120)}"
+        if respuesta:
+            linea += f" → R: {_primera_oracion(respuesta)}"
+        self.lineas_resumen.append(linea)
+        self.turnos_resumidos += 1
+
+        # Presupuesto del resumen: se descartan las líneas más antiguas
+        while len(self.lineas_resumen) > 1 and estimar_tokens(self.resumen) > self.tokens_resumen:
+            self.lineas_resumen.pop(0)
+            self.turnos_descartados += 1
+
+    def contexto_prompt(self, excluir_ultimo=True):
+        """
+        Historial para el prompt: resumen acumulado y turnos literales (cada
+        mensaje recortado a TOKENS_POR_MENSAJE). Por defecto omite el último
+        mensaje, que es la consulta que se está respondiendo.
+        """
+        mensajes = self.mensajes[:-1] if excluir_ultimo and self.mensajes else self.mensajes
+        partes = []
+        if self.lineas_resumen:
+            partes.append("Resumen de turnos anteriores:\n" + self.resumen)
+        if mensajes:
+            partes.append("\n".join(
+                f"{'Usuario' if m['role'] == 'user' else 'Asistente'}: {recortar(m['content'], TOKENS_POR_MENSAJE)}"
+                for m in mensajes
+            ))
+        return "\n\n".join(partes)
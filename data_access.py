@@ -0,0 +1,165 @@
+"""
+Capa de acceso a datos con caché en memoria compartida entre reruns de Streamlit.
+
+Cada rerun vuelve a ejecutar `app.py` completo, pero los módulos importados se
+conservan en el proceso: las lecturas frecuentes (métricas, resumen de los
+gráficos de "Inicio", histórico, muestras para el chat) se sirven desde esta
+caché con expiración por tiempo y se invalidan cuando se insertan riesgos nuevos.
+
+`version_datos()` expone contadores de versión de los riesgos y del almacén
+vectorial: las cachés derivadas (p. ej. las respuestas del asistente en
+answer_cache.py) guardan la versión con cada entrada y la descartan al cambiar.
+
+Las lecturas sin proyección explícita excluyen los campos pesados (vectores),
+que se guardan aparte en `risk_vectors`.
+"""
+
+import os
+import threading
+import time
+
+from metrics import obtener_metricas_riesgos, obtener_resumen_inicio
+from risk_vectors import guardar_vectores_riesgo
+
+TTL_DEFECTO = int(os.getenv("DATA_CACHE_TTL", "300"))
+
+# Proyección por defecto: solo excluye el embedding inline heredado. Las
+# lecturas para gráficos deben pasar la proyección de los campos que usan
+PROYECCION_LIGERA = {"embedding": 0}
+
+
+class CacheTTL:
+    """Caché clave -> valor con expiración por tiempo y contadores de uso"""
+
+    def __init__(self, ttl_segundos=TTL_DEFECTO):
+        self.ttl_segundos = ttl_segundos
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def obtener_o_calcular(self, clave, calcular):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                self.hits += 1
+                return entrada[1]
+            self.misses += 1
+
+        valor = calcular()
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl_segundos, valor)
+        return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._datos.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            vigentes = sum(1 for expira, _ in self._datos.values() if expira > ahora)
+        total = self.hits + self.misses
+        return {
+            "entradas": vigentes,
+            "ttl_segundos": self.ttl_segundos,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "invalidaciones": self.invalidaciones
+        }
+
+
+_cache = CacheTTL()
+_versiones = {"riesgos": 0, "vectores": 0}
+_lock_versiones = threading.Lock()
+
+
+def _clave(collection, *partes):
+    return (collection.full_name,) + tuple(repr(p) for p in partes)
+
+
+def _proyeccion(proyeccion):
+    return proyeccion if proyeccion else PROYECCION_LIGERA
+
+
+def leer_metricas(collection):
+    """Métricas del dashboard (ver metrics.obtener_metricas_riesgos)"""
+    return _cache.obtener_o_calcular(
+        _clave(collection, "metricas"),
+        lambda: obtener_metricas_riesgos(collection)
+    )
+
+
+def leer_resumen_inicio(collection):
+    """Tablas resumidas de los gráficos de "Inicio" (ver metrics.obtener_resumen_inicio)"""
+    return _cache.obtener_o_calcular(
+        _clave(collection, "resumen_inicio"),
+        lambda: obtener_resumen_inicio(collection)
+    )
+
+
+def leer_riesgos_empresa(collection, company, proyeccion=None):
+    """Todos los riesgos de una empresa (dashboard histórico)"""
+    proyeccion = _proyeccion(proyeccion)
+    documentos = _cache.obtener_o_calcular(
+        _clave(collection, "empresa", company, sorted(proyeccion.items())),
+        lambda: list(collection.find({'company': company}, proyeccion))
+    )
+    return list(documentos)
+
+
+def leer_muestra_riesgos(collection, limite, proyeccion=None):
+    """Primeros `limite` riesgos (contexto de ejemplo para el asistente)"""
+    proyeccion = _proyeccion(proyeccion)
+    documentos = _cache.obtener_o_calcular(
+        _clave(collection, "muestra", limite, sorted(proyeccion.items())),
+        lambda: list(collection.find({}, proyeccion).limit(limite))
+    )
+    return list(documentos)
+
+
+def leer_valores_distintos(collection, campo):
+    """Valores distintos de `campo` (áreas, activos, empresas) para reconocerlos en consultas"""
+    valores = _cache.obtener_o_calcular(
+        _clave(collection, "distintos", campo),
+        lambda: [v for v in collection.distinct(campo) if isinstance(v, str) and v.strip()]
+    )
+    return list(valores)
+
+
+def insertar_riesgos(collection, registros, vectores=None, collection_vectores=None):
+    """
+    Inserta riesgos nuevos e invalida las lecturas cacheadas. Si se indican
+    `vectores` (uno por registro) se guardan en `collection_vectores` con el
+    `_id` de cada riesgo, no dentro del documento.
+    """
+    resultado = collection.insert_many(registros)
+    if vectores is not None and collection_vectores is not None:
+        guardar_vectores_riesgo(collection_vectores, zip(resultado.inserted_ids, vectores))
+    invalidar_cache()
+    return resultado
+
+
+def marcar_cambio(origen):
+    """Incrementa la versión de `origen` ("riesgos" o "vectores")"""
+    with _lock_versiones:
+        _versiones[origen] = _versiones.get(origen, 0) + 1
+
+
+def version_datos():
+    """Versión actual de los datos (cambia con cada escritura de riesgos o vectores)"""
+    with _lock_versiones:
+        return tuple(sorted(_versiones.items()))
+
+
+def invalidar_cache():
+    _cache.invalidar()
+    marcar_cambio("riesgos")
+
+
+def estadisticas_cache():
+    return _cache.estadisticas()
@@ -0,0 +1,215 @@
+"""
+Caché persistente de embeddings direccionada por contenido.
+
+La clave es un hash SHA-256 del modelo y el texto. Los vectores se guardan en
+un archivo float32 mapeado en memoria (`vectores.f32`, un slot por entrada) que
+crece al doble bajo demanda hasta `max_entradas`. Cada clave se asocia a su slot
+en orden LRU: cada lote añade sus asignaciones a un registro (`indice.log`, una
+línea JSON por entrada) y solo al compactar se reescribe la instantánea
+`indice.json`, de modo que el costo de escribir no depende del tamaño de la
+caché. Al llegar a `max_entradas` se reutiliza el slot de la entrada usada hace
+más tiempo.
+"""
+
+import atexit
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DIRECTORIO_DEFECTO = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(".cache", "embeddings"))
+MAX_ENTRADAS_DEFECTO = int(os.getenv("EMBEDDING_CACHE_MAX", "20000"))
+CAPACIDAD_INICIAL = 1024  # Slots preasignados en el archivo de vectores al crearlo
+
+
+class EmbeddingCache:
+    """Caché LRU de embeddings en disco con contadores de aciertos y fallos"""
+
+    ARCHIVO_VECTORES = "vectores.f32"
+    ARCHIVO_INDICE = "indice.json"
+    ARCHIVO_REGISTRO = "indice.log"
+
+    def __init__(self, directorio=DIRECTORIO_DEFECTO, dimension=768, max_entradas=MAX_ENTRADAS_DEFECTO):
+        self.directorio = directorio
+        self.dimension = dimension
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directorio, exist_ok=True)
+        self._ruta_vectores = os.path.join(directorio, self.ARCHIVO_VECTORES)
+        self._ruta_indice = os.path.join(directorio, self.ARCHIVO_INDICE)
+        self._ruta_registro = os.path.join(directorio, self.ARCHIVO_REGISTRO)
+
+        self._indice = OrderedDict()  # clave -> slot, de menos a más reciente
+        self._lineas_registro = 0
+        meta = self._leer_indice()
+        compatible = (
+            meta is not None
+            and meta.get("dimension") == dimension
+            and meta.get("max_entradas") == max_entradas
+            and os.path.exists(self._ruta_vectores)
+        )
+        bytes_fila = dimension * np.dtype(np.float32).itemsize
+        if compatible:
+            self._capacidad = min(os.path.getsize(self._ruta_vectores) // bytes_fila, max_entradas)
+            compatible = self._capacidad > 0
+        if compatible:
+            self._indice = OrderedDict((clave, slot) for clave, slot in meta["entradas"])
+            self._reproducir_registro()
+            # Descartar slots fuera del archivo (escritura interrumpida)
+            for clave in [c for c, slot in self._indice.items() if slot >= self._capacidad]:
+                del self._indice[clave]
+        else:
+            self._capacidad = min(CAPACIDAD_INICIAL, max_entradas)
+            self._indice = OrderedDict()
+
+        self._vectores = np.memmap(
+            self._ruta_vectores,
+            dtype=np.float32,
+            mode="r+" if compatible else "w+",
+            shape=(self._capacidad, dimension)
+        )
+        if not compatible:
+            self._escribir_indice()
+        ocupados = set(self._indice.values())
+        self._libres = [slot for slot in range(self._capacidad - 1, -1, -1) if slot not in ocupados]
+        atexit.register(self.cerrar)
+
+    @staticmethod
+    def clave(texto, modelo):
+        return hashlib.sha256(f"{modelo}\x00{texto}".encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self._indice)
+
+    def _leer_indice(self):
+        try:
+            with open(self._ruta_indice, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _reproducir_registro(self):
+        """Aplica sobre la instantánea las asignaciones clave -> slot del registro"""
+        por_slot = {slot: clave for clave, slot in self._indice.items()}
+        try:
+            with open(self._ruta_registro, "r", encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        clave, slot = json.loads(linea)
+                    except (ValueError, TypeError):
+                        break  # Última línea incompleta
+                    anterior = por_slot.get(slot)
+                    if anterior is not None and anterior != clave:
+                        self._indice.pop(anterior, None)
+                    self._indice[clave] = slot
+                    self._indice.move_to_end(clave)
+                    por_slot[slot] = clave
+                    self._lineas_registro += 1
+        except OSError:
+            pass
+
+    def _escribir_indice(self):
+        """Compacta: reescribe la instantánea completa y vacía el registro"""
+        meta = {
+            "dimension": self.dimension,
+            "max_entradas": self.max_entradas,
+            "entradas": list(self._indice.items())
+        }
+        temporal = self._ruta_indice + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temporal, self._ruta_indice)
+        open(self._ruta_registro, "w", encoding="utf-8").close()
+        self._lineas_registro = 0
+
+    def _anotar(self, asignaciones):
+        """Añade las asignaciones del lote al registro; compacta si ya supera al índice"""
+        if not asignaciones:
+            return
+        with open(self._ruta_registro, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(par) + "\n" for par in asignaciones))
+        self._lineas_registro += len(asignaciones)
+        if self._lineas_registro > max(CAPACIDAD_INICIAL, len(self._indice)):
+            self._escribir_indice()
+
+    def _crecer(self):
+        """Duplica la capacidad del archivo de vectores (hasta `max_entradas`)"""
+        nueva = min(self._capacidad * 2, self.max_entradas)
+        self._vectores.flush()
+        del self._vectores
+        with open(self._ruta_vectores, "r+b") as f:
+            f.truncate(nueva * self.dimension * np.dtype(np.float32).itemsize)
+        self._vectores = np.memmap(
+            self._ruta_vectores, dtype=np.float32, mode="r+", shape=(nueva, self.dimension)
+        )
+        self._libres = list(range(nueva - 1, self._capacidad - 1, -1)) + self._libres
+        self._capacidad = nueva
+
+    def cerrar(self):
+        """Vuelca los vectores y compacta el registro (se llama también al salir)"""
+        with self._lock:
+            if self._lineas_registro:
+                self._vectores.flush()
+                self._escribir_indice()
+
+    def obtener_muchos(self, textos, modelo):
+        """Lista alineada con `textos`: el vector cacheado o None"""
+        resultados = []
+        with self._lock:
+            for texto in textos:
+                clave = self.clave(texto, modelo)
+                slot = self._indice.get(clave)
+                if slot is None:
+                    self.misses += 1
+                    resultados.append(None)
+                else:
+                    self.hits += 1
+                    self._indice.move_to_end(clave)
+                    resultados.append(self._vectores[slot].tolist())
+        return resultados
+
+    def obtener(self, texto, modelo):
+        return self.obtener_muchos([texto], modelo)[0]
+
+    def guardar_muchos(self, textos, modelo, vectores):
+        """Guarda vectores (se ignoran los de otra dimensión) y anota el lote en el registro"""
+        with self._lock:
+            asignaciones = []
+            for texto, vector in zip(textos, vectores):
+                if vector is None or len(vector) != self.dimension:
+                    continue
+                clave = self.clave(texto, modelo)
+                slot = self._indice.get(clave)
+                if slot is None:
+                    if not self._libres and self._capacidad < self.max_entradas:
+                        self._crecer()
+                    if self._libres:
+                        slot = self._libres.pop()
+                    else:
+                        # Expulsar la entrada menos usada recientemente
+                        _, slot = self._indice.popitem(last=False)
+                self._vectores[slot] = np.asarray(vector, dtype=np.float32)
+                self._indice[clave] = slot
+                self._indice.move_to_end(clave)
+                asignaciones.append((clave, slot))
+            if asignaciones:
+                self._vectores.flush()
+            self._anotar(asignaciones)
+
+    def estadisticas(self):
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._indice),
+            "max_entradas": self.max_entradas,
+            "capacidad": self._capacidad,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0
+        }
@@ -0,0 +1,203 @@
+"""
+Pipeline de embeddings por lotes para el sistema RAG de TechNova S.A.
+
+Envía los textos a Gemini en grupos (`batch_size`) en lugar de una llamada
+HTTP por chunk. Los resultados se devuelven en el mismo orden de entrada y
+un lote que falla recurre al embedding de respaldo sin afectar a los demás.
+
+Benchmark offline (sin red, usando el embedder local de prueba):
+    python embeddings.py --textos 500 --batch-size 32 --latencia-ms 40
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+MODELO_EMBEDDING = "text-embedding-004"
+DIMENSION_EMBEDDING = 768
+BATCH_SIZE_DEFECTO = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+MAX_WORKERS_DEFECTO = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+
+
+def embedding_fallback(texto):
+    """Embedding de respaldo basado en hash (cuando la API de Gemini no responde)"""
+    hash_obj = hashlib.md5(texto.encode('utf-8'))
+    hash_bytes = hash_obj.digest()
+    embedding = [float(b) / 255.0 for b in hash_bytes]
+    embedding = (embedding * 10)[:768]  # 768 dimensiones para compatibilidad
+    return embedding
+
+
+class GeminiEmbedder:
+    """Embeddings de Gemini; una sola llamada a embed_content por lote"""
+
+    def __init__(self, modelo=MODELO_EMBEDDING):
+        self.modelo = modelo
+
+    def embed_lote(self, textos):
+        import google.generativeai as genai
+
+        from resources import configurar_gemini
+        configurar_gemini()
+        response = genai.embed_content(model=self.modelo, content=list(textos))
+        embeddings = response["embedding"]
+        if len(embeddings) != len(textos):
+            raise ValueError(f"Se esperaban {len(textos)} embeddings y se recibieron {len(embeddings)}")
+        return embeddings
+
+
+class StubEmbedder:
+    """
+    Embedder local determinista para pruebas y benchmarks sin red.
+    `latencia_ms` simula el tiempo de ida y vuelta de cada llamada a la API.
+    """
+
+    def __init__(self, dimension=DIMENSION_EMBEDDING, latencia_ms=0.0, modelo="stub"):
+        self.dimension = dimension
+        self.latencia_ms = latencia_ms
+        self.modelo = modelo
+
+    def embed_lote(self, textos):
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000.0)
+        embeddings = []
+        for texto in textos:
+            semilla = int.from_bytes(hashlib.sha256(texto.encode('utf-8')).digest()[:8], "little")
+            vector = np.random.default_rng(semilla).standard_normal(self.dimension).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            embeddings.append(vector.tolist())
+        return embeddings
+
+
+_embedder_defecto = None
+_cache_defecto = None
+
+
+def obtener_embedder():
+    """Embedder por defecto del proceso (Gemini)"""
+    global _embedder_defecto
+    if _embedder_defecto is None:
+        _embedder_defecto = GeminiEmbedder()
+    return _embedder_defecto
+
+
+def obtener_cache_embeddings():
+    """Caché de embeddings en disco del proceso (None si no se puede abrir)"""
+    global _cache_defecto
+    if _cache_defecto is None:
+        try:
+            _cache_defecto = EmbeddingCache(dimension=DIMENSION_EMBEDDING)
+        except Exception as e:
+            print(f"Caché de embeddings deshabilitada: {e}")
+            _cache_defecto = False
+    return _cache_defecto if _cache_defecto is not False else None
+
+
+def _embed_lote_seguro(embedder, textos):
+    """Devuelve (embeddings, ok); si el lote falla se usa el respaldo por hash"""
+    try:
+        return embedder.embed_lote(textos), True
+    except Exception as e:
+        print(f"Error generando embeddings de un lote ({len(textos)} textos): {e}")
+        return [embedding_fallback(t) for t in textos], False
+
+
+def _embed_en_lotes(embedder, textos, batch_size, max_workers):
+    """Embeddings de `textos` en lotes paralelos; retorna (embeddings, ok) alineados"""
+    lotes = [textos[i:i + batch_size] for i in range(0, len(textos), batch_size)]
+
+    if len(lotes) == 1 or max_workers == 1:
+        resultados = [_embed_lote_seguro(embedder, lote) for lote in lotes]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(lotes))) as executor:
+            resultados = list(executor.map(lambda lote: _embed_lote_seguro(embedder, lote), lotes))
+
+    embeddings, ok = [], []
+    for vectores, lote_ok in resultados:
+        embeddings.extend(vectores)
+        ok.extend([lote_ok] * len(vectores))
+    return embeddings, ok
+
+
+def generar_embeddings_lote(textos, embedder=None, batch_size=None, max_workers=None, cache=None):
+    """
+    Genera embeddings para una lista de textos enviándolos en lotes.
+    Los lotes se procesan en paralelo y el resultado conserva el orden de entrada.
+    Con `cache` (por defecto la caché en disco del proceso; False para omitirla)
+    solo se envían a la API los textos no cacheados, una vez cada uno.
+    """
+    textos = list(textos)
+    if not textos:
+        return []
+
+    embedder = embedder or obtener_embedder()
+    batch_size = max(1, batch_size or BATCH_SIZE_DEFECTO)
+    max_workers = max(1, max_workers or MAX_WORKERS_DEFECTO)
+    if cache is None:
+        cache = obtener_cache_embeddings()
+    elif cache is False:
+        cache = None
+    modelo = getattr(embedder, "modelo", type(embedder).__name__)
+
+    embeddings = cache.obtener_muchos(textos, modelo) if cache is not None else [None] * len(textos)
+
+    # Textos pendientes sin duplicados, en orden de primera aparición
+    pendientes = list(dict.fromkeys(t for t, e in zip(textos, embeddings) if e is None))
+    if pendientes:
+        nuevos, ok = _embed_en_lotes(embedder, pendientes, batch_size, max_workers)
+        if cache is not None:
+            cacheables = [(t, e) for t, e, valido in zip(pendientes, nuevos, ok) if valido]
+            if cacheables:
+                cache.guardar_muchos([t for t, _ in cacheables], modelo, [e for _, e in cacheables])
+        por_texto = dict(zip(pendientes, nuevos))
+        embeddings = [e if e is not None else por_texto[t] for t, e in zip(textos, embeddings)]
+
+    return embeddings
+
+
+def promediar_embeddings(vectores, dimension=DIMENSION_EMBEDDING):
+    """
+    Vector único (media normalizada) de varios embeddings, p. ej. los chunks de
+    un mismo documento. Ignora los de otra dimensión; None si no queda ninguno.
+    """
+    validos = [v for v in vectores if v is not None and len(v) == dimension]
+    if not validos:
+        return None
+    media = np.mean(np.asarray(validos, dtype=np.float32), axis=0)
+    norma = np.linalg.norm(media)
+    if norma > 0:
+        media /= norma
+    return media.tolist()
+
+
+def _benchmark(n_textos, batch_size, max_workers, latencia_ms):
+    textos = [f"Riesgo {i}: acceso no autorizado al activo {i % 37} por credenciales débiles" for i in range(n_textos)]
+    embedder = StubEmbedder(latencia_ms=latencia_ms)
+
+    inicio = time.perf_counter()
+    generar_embeddings_lote(textos, embedder=embedder, batch_size=1, max_workers=1, cache=False)
+    t_serial = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    generar_embeddings_lote(textos, embedder=embedder, batch_size=batch_size, max_workers=max_workers, cache=False)
+    t_lotes = time.perf_counter() - inicio
+
+    print(f"Textos: {n_textos} | latencia simulada: {latencia_ms} ms por llamada")
+    print(f"Serial (1 llamada por texto): {t_serial:.3f} s ({n_textos / t_serial:.0f} textos/s)")
+    print(f"Por lotes (batch={batch_size}, workers={max_workers}): {t_lotes:.3f} s ({n_textos / t_lotes:.0f} textos/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline de embeddings por lotes")
+    parser.add_argument("--textos", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE_DEFECTO)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS_DEFECTO)
+    parser.add_argument("--latencia-ms", type=float, default=40.0)
+    args = parser.parse_args()
+    _benchmark(args.textos, args.batch_size, args.workers, args.latencia_ms)
@@ -0,0 +1,263 @@
+"""
+Ingesta de la base documental (`docs_infosec/`) en el sistema RAG.
+
+Extrae el texto página a página de los PDF (y por secciones de los DOCX) en un
+pool de procesos, lo divide en chunks, genera los embeddings por lotes y los
+guarda en `security_vectors` con su procedencia (archivo y página). Es
+incremental: un manifiesto con el SHA-256 de cada archivo permite omitir los
+que no cambiaron, reemplazar los modificados y retirar los eliminados.
+
+Uso:
+    python ingest_docs.py [--directorio docs_infosec] [--workers 4] [--forzar]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    from PyPDF2 import PdfReader
+except ImportError:
+    PdfReader = None
+
+try:
+    import docx
+except ImportError:
+    docx = None
+
+from chunking import TOKENS_DOCUMENTO, iterar_trozos
+from vector_ingest import asegurar_indice_hash, embedding_valido, retirar_archivo, upsert_documentos
+
+DIRECTORIO_DOCS = "docs_infosec"
+RUTA_MANIFIESTO = os.path.join(".cache", "ingesta_docs.json")
+EXTENSIONES = (".pdf", ".docx")
+PAGINAS_POR_TAREA = 16
+PARRAFOS_POR_SECCION = 25
+CHUNKS_POR_LOTE = 256  # Chunks que se embeben e insertan juntos
+PREFIJO_FUENTE = "doc:"
+
+
+def fuente_documento(archivo, pagina):
+    return f"{PREFIJO_FUENTE}{archivo}#p{pagina}"
+
+
+def es_fuente_documento(fuente):
+    return isinstance(fuente, str) and fuente.startswith(PREFIJO_FUENTE)
+
+
+def describir_fuente(fuente):
+    """'doc:NIST SP 800-30r1.pdf#p12' -> 'NIST SP 800-30r1.pdf, pág. 12'"""
+    archivo, _, pagina = fuente[len(PREFIJO_FUENTE):].rpartition("#p")
+    return f"{archivo}, pág. {pagina}" if archivo else fuente
+
+
+def hash_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _normalizar(texto):
+    """Colapsa espacios conservando los saltos de línea (párrafos y encabezados)"""
+    return "\n".join(" ".join(linea.split()) for linea in (texto or "").splitlines())
+
+
+def _extraer_paginas_pdf(ruta, inicio, fin):
+    """Texto de las páginas [inicio, fin) de un PDF (se ejecuta en un proceso hijo)"""
+    lector = PdfReader(ruta)
+    paginas = []
+    for numero in range(inicio, fin):
+        try:
+            texto = lector.pages[numero].extract_text()
+        except Exception as e:
+            print(f"⚠️ {os.path.basename(ruta)} pág. {numero + 1}: {e}")
+            texto = ""
+        paginas.append((numero + 1, _normalizar(texto)))
+    return ruta, paginas
+
+
+def _extraer_secciones_docx(ruta):
+    """Párrafos de un DOCX agrupados en secciones (los DOCX no tienen páginas)"""
+    documento = docx.Document(ruta)
+    parrafos = [p.text for p in documento.paragraphs if p.text.strip()]
+    for tabla in documento.tables:
+        for fila in tabla.rows:
+            parrafos.append(" | ".join(celda.text for celda in fila.cells))
+    secciones = []
+    for i in range(0, len(parrafos), PARRAFOS_POR_SECCION):
+        secciones.append((i // PARRAFOS_POR_SECCION + 1, _normalizar("\n\n".join(parrafos[i:i + PARRAFOS_POR_SECCION]))))
+    return ruta, secciones
+
+
+def _tareas_extraccion(rutas):
+    """Divide cada archivo en tareas (rangos de páginas) para el pool de procesos"""
+    tareas = []
+    for ruta in rutas:
+        if ruta.lower().endswith(".pdf"):
+            if PdfReader is None:
+                print(f"⚠️ PyPDF2 no está instalado: se omite {ruta}")
+                continue
+            total = len(PdfReader(ruta).pages)
+            for inicio in range(0, total, PAGINAS_POR_TAREA):
+                tareas.append((_extraer_paginas_pdf, (ruta, inicio, min(inicio + PAGINAS_POR_TAREA, total))))
+        elif ruta.lower().endswith(".docx"):
+            if docx is None:
+                print(f"⚠️ python-docx no está instalado: se omite {ruta}")
+                continue
+            tareas.append((_extraer_secciones_docx, (ruta,)))
+    return tareas
+
+
+def extraer_paginas(rutas, workers=None):
+    """Dict ruta -> [(página, texto)] extrayendo en paralelo con procesos"""
+    tareas = _tareas_extraccion(rutas)
+    paginas = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = [pool.submit(funcion, *args) for funcion, args in tareas]
+        for futuro in futuros:
+            ruta, extraidas = futuro.result()
+            paginas.setdefault(ruta, []).extend(extraidas)
+    for extraidas in paginas.values():
+        extraidas.sort()
+    return paginas
+
+
+def _trozos_de_paginas(paginas):
+    for pagina, texto in paginas:
+        for i, chunk in enumerate(iterar_trozos(texto, TOKENS_DOCUMENTO)):
+            yield pagina, i, chunk
+
+
+def documentos_de_archivo(archivo, sha256, paginas, embeddings_de, lote=CHUNKS_POR_LOTE):
+    """
+    Generador de lotes de chunks con embedding y procedencia (archivo, página):
+    los chunks se producen y embeben de `lote` en `lote`
+    """
+    trozos = _trozos_de_paginas(paginas)
+    while True:
+        ventana = [t for _, t in zip(range(lote), trozos)]
+        if not ventana:
+            return
+        embeddings = embeddings_de([chunk for _, _, chunk in ventana])
+        ingested_at = datetime.now(timezone.utc).isoformat()
+        yield [
+            {
+                "id": f"{archivo}_p{pagina}_{i}",
+                "texto": chunk,
+                "embedding": embedding,
+                "fuente": fuente_documento(archivo, pagina),
+                "archivo": archivo,
+                "pagina": pagina,
+                "sha256": sha256,
+                "ingested_at": ingested_at
+            }
+            for (pagina, i, chunk), embedding in zip(ventana, embeddings)
+        ]
+
+
+def cargar_manifiesto(ruta=RUTA_MANIFIESTO):
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_manifiesto(manifiesto, ruta=RUTA_MANIFIESTO):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def ingerir_directorio(collection, directorio=DIRECTORIO_DOCS, workers=None, forzar=False,
+                       ruta_manifiesto=RUTA_MANIFIESTO):
+    """
+    Ingesta incremental de `directorio` en `collection`. Retorna un resumen con
+    los archivos nuevos/actualizados, omitidos, eliminados y chunks creados.
+    """
+    from embeddings import generar_embeddings_lote
+
+    manifiesto = cargar_manifiesto(ruta_manifiesto)
+    archivos = sorted(f for f in os.listdir(directorio) if f.lower().endswith(EXTENSIONES))
+    resumen = {"procesados": [], "omitidos": [], "eliminados": [], "chunks": 0}
+
+    # Archivos que ya no están en el directorio
+    for archivo in sorted(set(manifiesto) - set(archivos)):
+        retirar_archivo(collection, archivo)
+        del manifiesto[archivo]
+        resumen["eliminados"].append(archivo)
+
+    hashes = {archivo: hash_archivo(os.path.join(directorio, archivo)) for archivo in archivos}
+    pendientes = [
+        archivo for archivo in archivos
+        if forzar or manifiesto.get(archivo, {}).get("sha256") != hashes[archivo]
+    ]
+    resumen["omitidos"] = [archivo for archivo in archivos if archivo not in pendientes]
+
+    paginas = extraer_paginas([os.path.join(directorio, a) for a in pendientes], workers)
+    for archivo in pendientes:
+        paginas_archivo = paginas.get(os.path.join(directorio, archivo))
+        if paginas_archivo is None:
+            continue  # Sin extractor disponible para este formato
+
+        # Los chunks compartidos con otros archivos se conservan (ver retirar_archivo)
+        retirar_archivo(collection, archivo)
+        total_chunks = sin_embedding = 0
+        for documentos in documentos_de_archivo(archivo, hashes[archivo], paginas_archivo, generar_embeddings_lote):
+            # Upsert por contenido: los chunks idénticos (p. ej. encabezados de
+            # página repetidos) se guardan una sola vez
+            sin_embedding += sum(1 for doc in documentos if not embedding_valido(doc))
+            total_chunks += len(upsert_documentos(collection, documentos))
+
+        # Con chunks omitidos (fallo de Gemini) el archivo queda pendiente para la próxima ingesta
+        manifiesto[archivo] = {
+            "sha256": hashes[archivo] if not sin_embedding else None,
+            "paginas": len(paginas_archivo),
+            "chunks": total_chunks,
+            "ingested_at": datetime.now(timezone.utc).isoformat()
+        }
+        guardar_manifiesto(manifiesto, ruta_manifiesto)
+        resumen["procesados"].append(archivo)
+        resumen["chunks"] += total_chunks
+        print(f"✅ {archivo}: {len(paginas_archivo)} páginas, {total_chunks} chunks")
+
+    guardar_manifiesto(manifiesto, ruta_manifiesto)
+    return resumen
+
+
+def formatear_contexto_documentos(resultados, max_caracteres=600):
+    """Sección del prompt con los fragmentos normativos y su procedencia"""
+    fragmentos = [
+        f"[{describir_fuente(r['fuente'])}] {r['texto'][:max_caracteres]}"
+        for r in resultados
+        if es_fuente_documento(r.get("fuente"))
+    ]
+    if not fragmentos:
+        return ""
+    return "NORMATIVA Y ESTÁNDARES DE REFERENCIA (docs_infosec):\n" + "\n\n".join(fragmentos)
+
+
+if __name__ == "__main__":
+    from resources import obtener_mongo_client
+
+    parser = argparse.ArgumentParser(description="Ingesta incremental de docs_infosec/ en el sistema RAG")
+    parser.add_argument("--directorio", default=DIRECTORIO_DOCS)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para la extracción (por defecto, núcleos)")
+    parser.add_argument("--forzar", action="store_true", help="Reprocesar aunque el hash no haya cambiado")
+    args = parser.parse_args()
+
+    collection = obtener_mongo_client()["security_embeddings_db"]["security_vectors"]
+    collection.create_index("archivo")
+    asegurar_indice_hash(collection)
+    resumen = ingerir_directorio(collection, args.directorio, args.workers, args.forzar)
+    print(
+        f"Procesados: {len(resumen['procesados'])} · Sin cambios: {len(resumen['omitidos'])} · "
+        f"Eliminados: {len(resumen['eliminados'])} · Chunks nuevos: {resumen['chunks']}"
+    )
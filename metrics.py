@@ -0,0 +1,221 @@
+"""
+Métricas del dashboard de riesgos calculadas en MongoDB con una sola agregación.
+
+Sustituye los `count_documents` por criticidad y el recorrido completo de
+`risk_records` en Python para contar los riesgos mitigados. Incluye también
+las agregaciones parametrizadas (conteos, rankings por campo y top de riesgos)
+con las que query_router.py responde preguntas estadísticas sin el LLM, y
+el resumen de los gráficos de la página "Inicio" (tablas pequeñas en lugar de
+todos los riesgos activos).
+"""
+
+CRITICIDADES = ["Crítico", "Alto", "Medio", "Bajo"]
+
+# Un riesgo está activo si `date_completed` no existe, es null o está vacío
+FILTRO_ACTIVOS = {"$or": [{"date_completed": {"$exists": False}}, {"date_completed": ""}, {"date_completed": None}]}
+_ES_ACTIVO = {"$eq": [{"$ifNull": ["$date_completed", ""]}, ""]}
+INDICE_METRICAS = "criticidad_date_completed"
+
+# Área responsable (asset_owner) -> categoría del heatmap de "Inicio"
+CATEGORIAS_AREA = [
+    ("TI y Seguridad", ["Área de TI", "Seguridad Informática"]),
+    ("Operaciones", ["Operaciones", "Logística"]),
+    ("Administrativo", ["Administración", "Legal", "Recursos Humanos"]),
+    ("Financiero", ["Finanzas"]),
+    ("Comercial", ["Ventas", "Marketing"]),
+    ("Desarrollo", ["Desarrollo de Software"]),
+    ("Calidad", ["Calidad"]),
+]
+CATEGORIA_AREA_DEFECTO = "Otros"
+_CATEGORIA_AREA = {
+    "$switch": {
+        "branches": [
+            {"case": {"$in": ["$asset_owner", propietarios]}, "then": categoria}
+            for categoria, propietarios in CATEGORIAS_AREA
+        ],
+        "default": CATEGORIA_AREA_DEFECTO
+    }
+}
+
+
+def asegurar_indices_metricas(collection):
+    """
+    Índice compuesto que cubre la agregación de métricas: obtener_metricas_riesgos
+    lo fuerza con `hint` y solo proyecta sus dos campos, así que recorre el
+    índice en lugar de los documentos
+    """
+    collection.create_index(
+        [("criticidad", 1), ("date_completed", 1)],
+        name=INDICE_METRICAS
+    )
+
+
+def obtener_metricas_riesgos(collection):
+    """
+    Totales, activos/mitigados y conteos por criticidad en una sola agregación.
+
+    Retorna un dict con `total`, `activos`, `mitigados`, `por_criticidad`
+    (activos por criticidad) y `por_criticidad_total` (todos los registros).
+    """
+    pipeline = [
+        {"$project": {"_id": 0, "criticidad": 1, "activo": _ES_ACTIVO}},
+        {
+            "$facet": {
+                "totales": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "total": {"$sum": 1},
+                            "activos": {"$sum": {"$cond": ["$activo", 1, 0]}}
+                        }
+                    }
+                ],
+                "por_criticidad": [
+                    {
+                        "$group": {
+                            "_id": "$criticidad",
+                            "total": {"$sum": 1},
+                            "activos": {"$sum": {"$cond": ["$activo", 1, 0]}}
+                        }
+                    }
+                ]
+            }
+        }
+    ]
+
+    # Sin $match el planificador haría COLLSCAN; con el hint es un recorrido del índice
+    try:
+        cursor = collection.aggregate(pipeline, hint=INDICE_METRICAS)
+    except Exception:
+        cursor = collection.aggregate(pipeline)  # Índice aún no creado
+    resultado = next(cursor, {"totales": [], "por_criticidad": []})
+    totales = resultado["totales"][0] if resultado["totales"] else {"total": 0, "activos": 0}
+
+    por_criticidad = {c: 0 for c in CRITICIDADES}
+    por_criticidad_total = {c: 0 for c in CRITICIDADES}
+    for grupo in resultado["por_criticidad"]:
+        criticidad = grupo["_id"] if grupo["_id"] is not None else "Sin criticidad"
+        por_criticidad[criticidad] = grupo["activos"]
+        por_criticidad_total[criticidad] = grupo["total"]
+
+    return {
+        "total": totales["total"],
+        "activos": totales["activos"],
+        "mitigados": totales["total"] - totales["activos"],
+        "por_criticidad": por_criticidad,
+        "por_criticidad_total": por_criticidad_total
+    }
+
+
+def filtro_estado(activos):
+    """Filtro de riesgos activos (True) o mitigados (False)"""
+    return FILTRO_ACTIVOS if activos else {"$nor": FILTRO_ACTIVOS["$or"]}
+
+
+def contar_riesgos(collection, filtro=None):
+    """Número de riesgos que cumplen `filtro`"""
+    return collection.count_documents(filtro or {})
+
+
+def agrupar_riesgos(collection, campo, filtro=None, metrica="conteo", orden=-1, limite=None):
+    """
+    Riesgos agrupados por `campo` con su conteo y nivel de riesgo (NR) promedio
+    y máximo, ordenados por `metrica` ("conteo", "nr_promedio" o "nr_maximo").
+    Retorna [{"valor", "conteo", "nr_promedio", "nr_maximo"}].
+    """
+    pipeline = [
+        {"$match": filtro or {}},
+        {
+            "$group": {
+                "_id": f"${campo}",
+                "conteo": {"$sum": 1},
+                "nr_promedio": {"$avg": "$nivel_riesgo_NR"},
+                "nr_maximo": {"$max": "$nivel_riesgo_NR"}
+            }
+        },
+        {"$sort": {metrica: orden, "_id": 1}}
+    ]
+    if limite:
+        pipeline.append({"$limit": limite})
+    return [
+        {
+            "valor": grupo["_id"] if grupo["_id"] not in (None, "") else "Sin dato",
+            "conteo": grupo["conteo"],
+            "nr_promedio": grupo["nr_promedio"] or 0.0,
+            "nr_maximo": grupo["nr_maximo"] or 0.0
+        }
+        for grupo in collection.aggregate(pipeline)
+    ]
+
+
+def top_riesgos(collection, filtro=None, limite=5, orden=-1):
+    """Riesgos con mayor (o menor) nivel de riesgo NR que cumplen `filtro`"""
+    proyeccion = {
+        "_id": 0, "asset": 1, "asset_owner": 1, "criticidad": 1,
+        "nivel_riesgo_NR": 1, "treatment_suggested": 1, "risk_owner_suggested": 1
+    }
+    cursor = collection.find(filtro or {}, proyeccion).sort("nivel_riesgo_NR", orden).limit(limite)
+    return list(cursor)
+
+
+def obtener_resumen_inicio(collection):
+    """
+    Tablas de los gráficos de "Inicio" sobre los riesgos activos, en una sola
+    agregación: conteos por tratamiento, por criticidad y por valor de NR
+    (histograma) y promedios de probabilidad, impacto y NR por categoría de
+    área (`CATEGORIAS_AREA`, aplicada con $switch en el servidor).
+    """
+    pipeline = [
+        {"$match": FILTRO_ACTIVOS},
+        {
+            "$facet": {
+                "tratamientos": [
+                    {"$group": {"_id": {"$ifNull": ["$treatment_suggested", "Sin Tratamiento"]}, "conteo": {"$sum": 1}}},
+                    {"$sort": {"conteo": -1, "_id": 1}}
+                ],
+                "criticidad": [
+                    {"$match": {"criticidad": {"$ne": None}}},
+                    {"$group": {"_id": "$criticidad", "conteo": {"$sum": 1}}},
+                    {"$sort": {"conteo": -1, "_id": 1}}
+                ],
+                "nr": [
+                    {"$match": {"nivel_riesgo_NR": {"$type": "number"}}},
+                    {"$group": {"_id": "$nivel_riesgo_NR", "conteo": {"$sum": 1}}},
+                    {"$sort": {"_id": 1}}
+                ],
+                "areas": [
+                    {
+                        "$group": {
+                            "_id": _CATEGORIA_AREA,
+                            "prob_promedio": {"$avg": "$probability"},
+                            "impact_promedio": {"$avg": "$impact"},
+                            "nr_promedio": {"$avg": "$nivel_riesgo_NR"},
+                            "count": {"$sum": 1}
+                        }
+                    },
+                    {"$sort": {"count": -1, "_id": 1}}
+                ]
+            }
+        }
+    ]
+
+    resultado = next(collection.aggregate(pipeline), {})
+    return {
+        "tratamientos": [
+            {"tratamiento": g["_id"], "conteo": g["conteo"]} for g in resultado.get("tratamientos", [])
+        ],
+        "criticidad": [
+            {"criticidad": g["_id"], "conteo": g["conteo"]} for g in resultado.get("criticidad", [])
+        ],
+        "nr": [{"nr": g["_id"], "conteo": g["conteo"]} for g in resultado.get("nr", [])],
+        "areas": [
+            {
+                "area": g["_id"],
+                "prob_promedio": g["prob_promedio"] or 0.0,
+                "impact_promedio": g["impact_promedio"] or 0.0,
+                "nr_promedio": g["nr_promedio"] or 0.0,
+                "count": g["count"]
+            }
+            for g in resultado.get("areas", [])
+        ]
+    }
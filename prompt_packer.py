@@ -0,0 +1,120 @@
+"""
+Ensamblado de prompts con presupuesto de tokens.
+
+Los prompts del asistente incluían todos los riesgos procesados y todo el
+contexto recuperado sin límite: una carga de 2.000 filas producía un prompt
+lento, caro o directamente rechazado por el modelo. `EmpaquetadorPrompt`
+reparte un presupuesto de tokens entre secciones en orden de prioridad; lo que
+no cabe se comprime en un resumen agregado y se registra cuántos tokens usó
+cada sección.
+"""
+
+import os
+
+from chunking import CARACTERES_POR_TOKEN, estimar_tokens
+
+PRESUPUESTO_TOKENS_PROMPT = int(os.getenv("PROMPT_MAX_TOKENS", "6000"))
+TOKENS_RESUMEN = 200  # Máximo por resumen de elementos omitidos
+
+
+class EmpaquetadorPrompt:
+    """
+    Llena el presupuesto sección por sección: las secciones fijas siempre se
+    incluyen y las de elementos (`llenar`) toman elementos en orden hasta que
+    no queda espacio, dejando libre la `reserva` pedida para las siguientes.
+    """
+
+    def __init__(self, presupuesto_tokens=PRESUPUESTO_TOKENS_PROMPT):
+        self.presupuesto = presupuesto_tokens
+        self.usados = 0
+        self.secciones = {}
+
+    @property
+    def restante(self):
+        return max(0, self.presupuesto - self.usados)
+
+    def _registrar(self, nombre, texto, incluidos=0, omitidos=0, resumidos=0):
+        tokens = estimar_tokens(texto) if texto else 0
+        self.usados += tokens
+        self.secciones[nombre] = {
+            "texto": texto, "tokens": tokens, "incluidos": incluidos, "omitidos": omitidos, "resumidos": resumidos
+        }
+        return texto
+
+    def fijo(self, nombre, texto):
+        """Sección obligatoria (cabecera, consulta, instrucciones)"""
+        return self._registrar(nombre, texto or "")
+
+    def llenar(self, nombre, elementos, resumen=None, reserva=0, maximo=None, separador="\n"):
+        """
+        Agrega `elementos` (textos ya ordenados por prioridad) mientras quepan
+        en el presupuesto menos `reserva` (y en `maximo` tokens si se indica).
+        Si sobran y hay `resumen`, se agrega `resumen(omitidos)` como línea
+        agregada (hasta TOKENS_RESUMEN tokens, descontados del espacio).
+        """
+        disponible = self.restante - reserva
+        if maximo is not None:
+            disponible = min(disponible, maximo)
+        elementos = list(elementos)
+        total = sum(estimar_tokens(e + separador) for e in elementos)
+        if resumen is not None and total > disponible:
+            disponible -= TOKENS_RESUMEN
+
+        incluidos, tokens = [], 0
+        for elemento in elementos:
+            costo = estimar_tokens(elemento + separador)
+            if tokens + costo > disponible:
+                break
+            incluidos.append(elemento)
+            tokens += costo
+
+        omitidos = elementos[len(incluidos):]
+        partes = list(incluidos)
+        resumidos = 0
+        if omitidos and resumen is not None:
+            texto_resumen = resumen(omitidos)
+            if texto_resumen:
+                partes.append(recortar(texto_resumen, TOKENS_RESUMEN))
+                resumidos = len(omitidos)
+        return self._registrar(nombre, separador.join(partes), len(incluidos), len(omitidos), resumidos)
+
+    def texto(self, nombre):
+        seccion = self.secciones.get(nombre)
+        return seccion["texto"] if seccion else ""
+
+    def uso(self):
+        """Tokens por sección, total y presupuesto (para mostrar o registrar)"""
+        return {
+            "secciones": {
+                nombre: {k: v for k, v in seccion.items() if k != "texto"}
+                for nombre, seccion in self.secciones.items()
+            },
+            "total": self.usados,
+            "presupuesto": self.presupuesto
+        }
+
+
+def recortar(texto, max_tokens):
+    """Corta un texto al número aproximado de tokens indicado"""
+    if estimar_tokens(texto) <= max_tokens:
+        return texto
+    return texto[:max_tokens * CARACTERES_POR_TOKEN].rsplit(" ", 1)[0] + "…"
+
+
+def fragmentos_de_contexto(contexto):
+    """Contexto recuperado (texto o lista de resultados) -> lista de fragmentos en orden de score"""
+    if not contexto:
+        return []
+    if isinstance(contexto, str):
+        return [f.strip() for f in contexto.split("\n\n") if f.strip()]
+    return [r["texto"] if isinstance(r, dict) else str(r) for r in contexto]
+
+
+def describir_uso(uso):
+    """'riesgos 1.840 · contexto 900 · ... — total 3.100 / 6.000 tokens'"""
+    partes = [
+        f"{nombre} {datos['tokens']:,}" + (f" ({datos['resumidos']} resumidos)" if datos["resumidos"] else "")
+        for nombre, datos in uso["secciones"].items()
+        if datos["tokens"]
+    ]
+    return f"{' · '.join(partes)} — total {uso['total']:,} / {uso['presupuesto']:,} tokens".replace(",", ".")
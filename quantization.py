@@ -0,0 +1,195 @@
+"""
+Codificación compacta de embeddings y búsqueda en dos fases.
+
+- En MongoDB los vectores se guardan como binario float32 (subtipo vector de
+  BSON, requiere pymongo >= 4.10): 4 bytes por dimensión en lugar de los ~13
+  de un arreglo de doubles (8 del valor más tipo y clave de cada elemento),
+  unas 3 veces menos. Con un pymongo anterior se guarda el arreglo: un binario
+  genérico no lo indexa `$vectorSearch` de Atlas.
+- En memoria, `MatrizCuantizada` mantiene solo una copia cuantizada para la
+  primera fase de la búsqueda: float16 (2 bytes/dim) o int8 con una escala por
+  vector (1 byte/dim). Los vectores float32 completos quedan en un archivo
+  abierto con mmap y solo se leen para re-puntuar los mejores candidatos.
+
+Benchmark de memoria y recall@k frente a la búsqueda exacta en float32:
+    python quantization.py --vectores 50000 --consultas 200 --modos float16 int8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from bson.binary import Binary
+
+try:
+    from bson.binary import BinaryVectorDtype
+except ImportError:  # pymongo < 4.10: sin subtipo vector, se guardan arreglos
+    BinaryVectorDtype = None
+
+FACTOR_RESCORE = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))  # Candidatos re-puntuados = k · factor
+MODOS = ("float16", "int8")
+BLOQUE = 1024
+
+
+def codificar_vector(vector):
+    """
+    Vector -> Binary float32 (4 bytes por dimensión en lugar de ~13 como
+    arreglo BSON). Sin BinaryVectorDtype, lista de floats indexable por Atlas
+    """
+    valores = np.asarray(vector, dtype=np.float32)
+    if BinaryVectorDtype is not None:
+        return Binary.from_vector(valores.tolist(), BinaryVectorDtype.FLOAT32)
+    return [float(v) for v in valores]
+
+
+def decodificar_vector(binario):
+    """Binary (vector BSON o bytes float32) o lista -> np.ndarray float32"""
+    if isinstance(binario, Binary) and BinaryVectorDtype is not None and binario.subtype == 9:
+        return np.asarray(binario.as_vector().data, dtype=np.float32)
+    if isinstance(binario, (bytes, Binary)):
+        return np.frombuffer(bytes(binario), dtype="<f4").astype(np.float32)
+    return np.asarray(binario, dtype=np.float32)
+
+
+def modo_cuantizacion(modo):
+    """Normaliza el modo configurado: 'float16', 'int8' o None (sin cuantizar)"""
+    modo = (modo or "").lower()
+    return modo if modo in MODOS else None
+
+
+def cuantizar(matriz, modo):
+    """
+    Filas float32 -> (códigos, escalas). float16 no usa escalas; int8 guarda
+    por vector la escala max|x| / 127 (código = round(x / escala)).
+    """
+    matriz = np.asarray(matriz, dtype=np.float32)
+    if modo == "float16":
+        return matriz.astype(np.float16), None
+    escalas = np.abs(matriz).max(axis=1) / 127.0
+    escalas[escalas == 0] = 1.0
+    codigos = np.clip(np.rint(matriz / escalas[:, None]), -127, 127).astype(np.int8)
+    return codigos, escalas.astype(np.float32)
+
+
+class MatrizCuantizada:
+    """
+    Copia cuantizada en memoria de una matriz de embeddings más los vectores
+    float32 completos en disco. `completa` es un memmap (el de matriz.npy al
+    recargar un store persistido, o un archivo temporal propio al agregar).
+    """
+
+    def __init__(self, dimension, modo="int8"):
+        self.dimension = dimension
+        self.modo = modo
+        self.codigos = np.empty((0, dimension), dtype=np.float16 if modo == "float16" else np.int8)
+        self.escalas = None if modo == "float16" else np.empty(0, dtype=np.float32)
+        self.completa = np.empty((0, dimension), dtype=np.float32)
+        self._archivo = None
+
+    @classmethod
+    def desde_matriz(cls, matriz, modo="int8"):
+        """Cuantiza una matriz existente; si es un memmap se usa como copia completa sin duplicarla"""
+        cuantizada = cls(matriz.shape[1], modo)
+        partes = [cuantizar(matriz[i:i + BLOQUE], modo) for i in range(0, matriz.shape[0], BLOQUE)]
+        if partes:
+            cuantizada.codigos = np.concatenate([p[0] for p in partes])
+            if cuantizada.escalas is not None:
+                cuantizada.escalas = np.concatenate([p[1] for p in partes])
+        if isinstance(matriz, np.memmap):
+            cuantizada.completa = matriz
+        else:
+            cuantizada._volcar(np.asarray(matriz, dtype=np.float32))
+        return cuantizada
+
+    def __len__(self):
+        return self.codigos.shape[0]
+
+    @property
+    def bytes_memoria(self):
+        """Memoria residente de la primera fase (códigos + escalas)"""
+        return self.codigos.nbytes + (self.escalas.nbytes if self.escalas is not None else 0)
+
+    def agregar(self, nuevos):
+        nuevos = np.asarray(nuevos, dtype=np.float32).reshape(-1, self.dimension)
+        codigos, escalas = cuantizar(nuevos, self.modo)
+        self.codigos = np.concatenate([self.codigos, codigos])
+        if self.escalas is not None:
+            self.escalas = np.concatenate([self.escalas, escalas])
+        self._volcar(nuevos)
+
+    def _volcar(self, nuevos):
+        """Agrega filas float32 al archivo de respaldo y reabre el memmap"""
+        if self._archivo is None:
+            self._archivo = tempfile.TemporaryFile()
+            # Las filas de un memmap ajeno (matriz.npy de solo lectura) se copian una vez
+            for i in range(0, self.completa.shape[0], BLOQUE):
+                self._archivo.write(np.ascontiguousarray(self.completa[i:i + BLOQUE], dtype="<f4").tobytes())
+        self._archivo.seek(0, os.SEEK_END)
+        self._archivo.write(np.ascontiguousarray(nuevos, dtype="<f4").tobytes())
+        self._archivo.flush()
+        filas = self._archivo.tell() // (4 * self.dimension)
+        self.completa = np.memmap(self._archivo, dtype="<f4", mode="r", shape=(filas, self.dimension))
+
+    def puntuar(self, query, posiciones=None):
+        """Productos punto aproximados (primera fase) para `posiciones` o para todas las filas"""
+        query = np.asarray(query, dtype=np.float32)
+        if posiciones is not None:
+            codigos = self.codigos[posiciones]
+            escalas = self.escalas[posiciones] if self.escalas is not None else None
+            scores = codigos.astype(np.float32) @ query
+            return scores * escalas if escalas is not None else scores
+
+        scores = np.empty(len(self), dtype=np.float32)
+        for i in range(0, len(self), BLOQUE):
+            scores[i:i + BLOQUE] = self.codigos[i:i + BLOQUE].astype(np.float32) @ query
+        return scores * self.escalas if self.escalas is not None else scores
+
+    def reescalar(self, query, posiciones):
+        """Productos punto exactos (float32 desde disco) para las posiciones candidatas"""
+        orden = np.sort(posiciones)  # Lectura secuencial del memmap
+        exactos = np.asarray(self.completa[orden], dtype=np.float32) @ np.asarray(query, dtype=np.float32)
+        return orden, exactos
+
+
+def _benchmark(n_vectores, dimension, n_consultas, k, modos):
+    from ann_index import _datos_sinteticos, recall_at_k
+    from vector_store import LocalVectorStore
+
+    rng = np.random.default_rng(42)
+    datos = _datos_sinteticos(n_vectores + n_consultas, dimension, max(8, n_vectores // 500), rng)
+    base, consultas = datos[:n_vectores], datos[n_vectores:]
+    documentos = [{"texto": str(i), "fuente": "bench", "embedding": v} for i, v in enumerate(base)]
+
+    def medir(store):
+        inicio = time.perf_counter()
+        resultados = [[r["texto"] for r in store.buscar(q, k=k)] for q in consultas]
+        return resultados, (time.perf_counter() - inicio) * 1000 / n_consultas
+
+    exacto = LocalVectorStore(dimension)
+    exacto.agregar(documentos)
+    exactos, ms = medir(exacto)
+    mb = exacto._matriz.nbytes / 2 ** 20
+    print(f"{n_vectores} vectores de {dimension} dimensiones")
+    print(f"float32      : {mb:8.1f} MB en memoria  {ms:7.2f} ms/consulta  recall@{k}=1.000")
+
+    for modo in modos:
+        store = LocalVectorStore(dimension, cuantizacion=modo)
+        store.agregar(documentos)
+        resultados, ms = medir(store)
+        mb = store._cuantizada.bytes_memoria / 2 ** 20
+        print(f"{modo:<8} +rs : {mb:8.1f} MB en memoria  {ms:7.2f} ms/consulta  "
+              f"recall@{k}={recall_at_k(exactos, resultados):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de memoria y recall@k de los embeddings cuantizados")
+    parser.add_argument("--vectores", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--modos", nargs="+", default=list(MODOS), choices=MODOS)
+    args = parser.parse_args()
+
+    _benchmark(args.vectores, args.dimension, args.consultas, args.k, args.modos)
@@ -0,0 +1,307 @@
+"""
+Enrutador local de las consultas del Asistente IA.
+
+Muchas preguntas del chat son conteos o rankings ("¿cuántos riesgos críticos
+hay?", "¿qué área tiene más riesgos?") que el registro de riesgos responde de
+forma exacta. `clasificar` reconoce localmente (sin modelo) las intenciones de
+conteo, ranking y listado con sus filtros, y `responder_consulta` las resuelve
+con agregaciones de `risk_records` (ver metrics.py) en decenas de
+milisegundos. Solo se enruta una consulta si todas sus palabras se entienden:
+cualquier término desconocido ("...para activos financieros") o una negación
+("no mitigados", "sin tratar") la deja para Gemini.
+"""
+
+from answer_cache import normalizar_consulta
+from bm25 import STOPWORDS
+from metrics import agrupar_riesgos, contar_riesgos, filtro_estado, top_riesgos
+
+LIMITE_LISTADO = 5
+LIMITE_RANKING = 5
+
+# Campos cuyos valores se reconocen en el texto de la consulta
+CAMPOS_RECONOCIDOS = ("asset_owner", "asset", "company")
+
+CRITICIDADES = {
+    "critico": "Crítico", "criticos": "Crítico", "critica": "Crítico", "criticas": "Crítico",
+    "alto": "Alto", "altos": "Alto", "alta": "Alto", "altas": "Alto",
+    "medio": "Medio", "medios": "Medio", "media": "Medio", "medias": "Medio",
+    "bajo": "Bajo", "bajos": "Bajo", "baja": "Bajo", "bajas": "Bajo",
+}
+TRATAMIENTOS = {"tratar": "Tratar", "transferir": "Transferir", "evitar": "Evitar", "aceptar": "Aceptar"}
+ESTADOS = {
+    "mitigado": False, "mitigados": False, "mitigadas": False, "cerrados": False,
+    "completados": False, "resueltos": False,
+    "abiertos": True, "pendientes": True, "vigentes": True, "activos": True, "activo": True,
+}
+# Frases (en tokens normalizados) -> campo agrupable
+DIMENSIONES = [
+    (("tipo", "de", "dato"), "data_type"), (("tipo", "de", "datos"), "data_type"),
+    (("tipos", "de", "datos"), "data_type"), (("tipos", "de", "dato"), "data_type"),
+    (("area",), "asset_owner"), (("areas",), "asset_owner"),
+    (("departamento",), "asset_owner"), (("departamentos",), "asset_owner"),
+    (("propietario",), "asset_owner"), (("propietarios",), "asset_owner"),
+    (("activo",), "asset"), (("activos",), "asset"),
+    (("tratamiento",), "treatment_suggested"), (("tratamientos",), "treatment_suggested"),
+    (("responsable",), "risk_owner_suggested"), (("responsables",), "risk_owner_suggested"),
+    (("empresa",), "company"), (("empresas",), "company"),
+    (("criticidad",), "criticidad"), (("criticidades",), "criticidad"),
+]
+# Campo -> (singular, plural, artículo del singular)
+ETIQUETAS = {
+    "asset_owner": ("área", "áreas", "el"),
+    "asset": ("activo", "activos", "el"),
+    "treatment_suggested": ("tratamiento", "tratamientos", "el"),
+    "risk_owner_suggested": ("responsable", "responsables", "el"),
+    "data_type": ("tipo de dato", "tipos de dato", "el"),
+    "company": ("empresa", "empresas", "la"),
+    "criticidad": ("criticidad", "criticidades", "la"),
+}
+# "los riesgos de la empresa" es el contexto de la pregunta, no una agrupación por empresa
+POSESIVOS_EMPRESA = {"la", "nuestra", "esta", "mi"}
+SUJETO = {"riesgo", "riesgos"}
+MAS = {"mas", "mayor", "mayores", "top", "principales", "peores"}
+MENOS = {"menos", "menor", "menores"}
+METRICA_NR = {"nivel", "nr", "puntuacion", "puntaje", "promedio", "score"}
+CONTEO = {"cuantos", "cuantas", "numero", "cantidad"}
+LISTADO = {"cuales", "lista", "listar", "listado", "muestra", "muestrame", "dame", "enumera"}
+DISTRIBUCION = {"distribucion", "distribuyen", "reparten", "desglose"}
+# Referencias a la conversación previa ("¿y cuántos de esos...?"): las resuelve el LLM con el historial
+ANAFORAS = {"esos", "esas", "estos", "estas", "ellos", "ellas", "anteriores", "mismos", "mismas", "anterior"}
+# Negaciones y exclusiones ("no mitigados", "sin tratar", "todos menos los críticos"):
+# invierten el filtro, así que la consulta se deja al LLM en lugar de contar lo contrario
+NEGACIONES = {"no", "sin", "ni", "excepto", "salvo", "exceptuando", "salvando", "tampoco", "nunca", "ningun", "ninguno", "ninguna"}
+ARTICULOS = {"el", "la", "lo", "los", "las", "un", "una", "unos", "unas"}
+NUMEROS = {"uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5, "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10}
+RELLENO = (STOPWORDS - NEGACIONES) | {
+    "hay", "existen", "tiene", "tienen", "tenemos", "son", "riesgo", "riesgos", "registrados", "registrado",
+    "registro", "actualmente", "ahora", "hoy", "cual", "que", "quien", "quienes", "concentra", "concentran",
+    "acumula", "acumulan", "total", "dime", "indica", "el", "los", "las", "en", "de", "con", "actual",
+}
+
+
+def _buscar_frase(tokens, frase, consumidos):
+    """Posición de la primera aparición libre de `frase` en `tokens`, o -1"""
+    n = len(frase)
+    for i in range(len(tokens) - n + 1):
+        if tuple(tokens[i:i + n]) == frase and not consumidos.intersection(range(i, i + n)):
+            return i
+    return -1
+
+
+def _es_negacion(tokens):
+    """
+    True si la consulta niega o excluye algo. "menos" solo cuenta como
+    exclusión ("todos menos los críticos", "al menos", "por lo menos"), no
+    como superlativo ("el área con menos riesgos", "los menos críticos")
+    """
+    for i, token in enumerate(tokens):
+        if token in NEGACIONES:
+            return True
+        if token == "menos":
+            previo = tokens[i - 1] if i > 0 else ""
+            siguiente = tokens[i + 1] if i + 1 < len(tokens) else ""
+            if previo in ("todos", "todas", "al", "lo") or (siguiente in ARTICULOS and previo not in ARTICULOS):
+                return True
+    return False
+
+
+def clasificar(consulta, valores_conocidos=None):
+    """
+    Intención estadística de la consulta o None si debe responderla el LLM.
+
+    Retorna un dict con `tipo` ("conteo", "distintos", "ranking" o "listado"),
+    `filtro` (MongoDB), `descripcion` de los filtros, `campo`, `metrica`,
+    `orden` y `limite`.
+    """
+    tokens = normalizar_consulta(consulta).split()
+    if not tokens or ANAFORAS.intersection(tokens) or _es_negacion(tokens):
+        return None
+    consumidos = set()
+    filtros, descripcion = [], []
+
+    # Valores conocidos del registro ("Área de TI", "Portal web clientes"), los más largos primero
+    candidatos = [
+        (tuple(normalizar_consulta(valor).split()), campo, valor)
+        for campo, valores in (valores_conocidos or {}).items()
+        for valor in valores
+    ]
+    for frase, campo, valor in sorted(candidatos, key=lambda c: -len(c[0])):
+        if not frase:
+            continue
+        i = _buscar_frase(tokens, frase, consumidos)
+        if i >= 0:
+            consumidos.update(range(i, i + len(frase)))
+            filtros.append({campo: valor})
+            etiqueta, _, articulo = ETIQUETAS[campo]
+            if frase[0] == normalizar_consulta(etiqueta):
+                etiqueta = ""  # "del Área de TI", no "del área Área de TI"
+            articulo = "de la" if articulo == "la" else "del"
+            descripcion.append(" ".join(p for p in (articulo, etiqueta, valor) if p))
+
+    def es_estado(i):
+        # "riesgos activos" / "riesgos críticos activos" es un estado, no la dimensión activo
+        return i > 0 and (tokens[i - 1] in ("riesgo", "riesgos") or tokens[i - 1] in CRITICIDADES)
+
+    campo = None
+    for frase, campo_frase in DIMENSIONES:
+        i = _buscar_frase(tokens, frase, consumidos)
+        if i >= 0 and frase == ("empresa",) and i > 0 and tokens[i - 1] in POSESIVOS_EMPRESA:
+            consumidos.add(i)  # "...de la empresa": contexto, no dimensión
+            continue
+        if i >= 0 and not (campo_frase == "asset" and es_estado(i)):
+            if campo is None:
+                campo = campo_frase
+                consumidos.update(range(i, i + len(frase)))
+
+    superlativo, metrica_nr, por_campo, limite = None, False, False, None
+    conteo = listado = distribucion = False
+    criticidades, tratamientos, estado = [], [], None
+    for i, token in enumerate(tokens):
+        if i in consumidos:
+            continue
+        previo = tokens[i - 1] if i > 0 else ""
+        if token in MAS or token in MENOS:
+            superlativo = -1 if token in MAS else 1
+        elif token in CRITICIDADES and (previo in MAS or previo in MENOS):
+            metrica_nr = True  # "más críticos", "más alto": orden por NR, no filtro
+        elif token in METRICA_NR:
+            metrica_nr = True
+        elif token in CRITICIDADES:
+            criticidades.append(CRITICIDADES[token])
+        elif token in TRATAMIENTOS:
+            tratamientos.append(TRATAMIENTOS[token])
+        elif token in ESTADOS and (not token.startswith("activo") or es_estado(i)):
+            estado = ESTADOS[token]
+        elif token in CONTEO:
+            conteo = True
+        elif token in LISTADO:
+            listado = True
+        elif token in DISTRIBUCION:
+            distribucion = True
+        elif token == "por" and campo is not None:
+            por_campo = True
+        elif token.isdigit() and 0 < int(token) <= 50:
+            limite = int(token)
+        elif token in NUMEROS:
+            limite = NUMEROS[token]
+        elif token not in RELLENO:
+            return None  # Término que no se entiende: mejor que responda el LLM
+        consumidos.add(i)
+
+    if criticidades:
+        criticidades = sorted(set(criticidades), key=list(CRITICIDADES.values()).index)
+        filtros.append({"criticidad": criticidades[0] if len(criticidades) == 1 else {"$in": criticidades}})
+        descripcion.insert(0, " y ".join(c.lower() + "s" for c in criticidades))
+    if tratamientos:
+        filtros.append({"treatment_suggested": {"$in": tratamientos}})
+        descripcion.append(f"con tratamiento {' o '.join(tratamientos)}")
+    if estado is not None:
+        filtros.append(filtro_estado(estado))
+        descripcion.insert(1 if criticidades else 0, "activos" if estado else "mitigados")
+
+    # Seguimientos sin sujeto ("dame más", "¿cuántos?") dependen de la
+    # conversación: los responde el LLM con la memoria del chat
+    if not filtros and campo is None and not SUJETO.intersection(tokens):
+        return None
+
+    intencion = {
+        "filtro": filtros[0] if len(filtros) == 1 else ({"$and": filtros} if filtros else {}),
+        "descripcion": " ".join(descripcion),
+        "campo": campo,
+        "metrica": "nr_promedio" if metrica_nr else "conteo",
+        "orden": superlativo or -1,
+        "limite": limite,
+    }
+    if campo is not None and (superlativo or por_campo or distribucion):
+        intencion["tipo"] = "ranking"
+        if superlativo and not (por_campo or distribucion):
+            intencion["limite"] = limite or LIMITE_RANKING
+    elif conteo:
+        intencion["tipo"] = "distintos" if campo is not None else "conteo"
+    elif (listado or superlativo) and campo is None:
+        intencion["tipo"] = "listado"
+        intencion["limite"] = limite or LIMITE_LISTADO
+    else:
+        return None
+    return intencion
+
+
+def ejecutar(intencion, collection):
+    """Resultados de la agregación correspondiente a la intención"""
+    tipo, filtro = intencion["tipo"], intencion["filtro"]
+    if tipo == "conteo":
+        return contar_riesgos(collection, filtro)
+    if tipo == "distintos":
+        return agrupar_riesgos(collection, intencion["campo"], filtro)
+    if tipo == "ranking":
+        return agrupar_riesgos(
+            collection, intencion["campo"], filtro, intencion["metrica"], intencion["orden"], intencion["limite"]
+        )
+    return top_riesgos(collection, filtro, intencion["limite"], intencion["orden"])
+
+
+def _riesgos(descripcion, n=2, mayuscula=False):
+    texto = "riesgo" if n == 1 else "riesgos"
+    if mayuscula:
+        texto = texto.capitalize()
+    return f"{texto} {descripcion}".strip()
+
+
+def formatear(intencion, resultado):
+    """Respuesta en markdown para el chat"""
+    tipo, descripcion = intencion["tipo"], intencion["descripcion"]
+    nota = "\n\n_Calculado directamente sobre el registro de riesgos._"
+
+    if tipo == "conteo":
+        if not resultado:
+            return f"No hay {_riesgos(descripcion)} registrados." + nota
+        cantidad = f"{resultado:,}".replace(",", ".")
+        return f"Hay **{cantidad}** {_riesgos(descripcion, resultado)} registrados." + nota
+
+    singular, plural, articulo = ETIQUETAS.get(intencion["campo"], ("valor", "valores", "el"))
+    if not resultado:
+        return f"No hay {_riesgos(descripcion)} registrados." + nota
+
+    if tipo == "distintos":
+        total = sum(g["conteo"] for g in resultado)
+        return f"**{len(resultado)}** {plural} tienen {_riesgos(descripcion)} ({total} en total)." + nota
+
+    if tipo == "ranking":
+        mejor = resultado[0]
+        if intencion["metrica"] == "nr_promedio":
+            criterio = "mayor" if intencion["orden"] < 0 else "menor"
+            encabezado = (
+                f"**{mejor['valor']}** es {articulo} {singular} con {criterio} nivel de riesgo promedio "
+                f"({mejor['nr_promedio']:.1f}) entre los {_riesgos(descripcion)}."
+            )
+        elif intencion["limite"]:
+            criterio = "más" if intencion["orden"] < 0 else "menos"
+            encabezado = f"**{mejor['valor']}** es {articulo} {singular} con {criterio} {_riesgos(descripcion)} ({mejor['conteo']})."
+        else:
+            encabezado = f"Distribución de {_riesgos(descripcion)} por {singular}:"
+        filas = "\n".join(
+            f"| {g['valor']} | {g['conteo']} | {g['nr_promedio']:.1f} | {g['nr_maximo']:.1f} |" for g in resultado
+        )
+        tabla = f"| {singular.capitalize()} | Riesgos | NR promedio | NR máximo |\n|---|---|---|---|\n{filas}"
+        return f"{encabezado}\n\n{tabla}" + nota
+
+    criterio = "mayor" if intencion["orden"] < 0 else "menor"
+    lineas = [
+        f"{i}. **{r.get('asset', 'N/A')}** ({r.get('asset_owner', 'N/A')}) — NR {float(r.get('nivel_riesgo_NR', 0) or 0):.1f}"
+        f" · {r.get('criticidad', 'N/A')} · Tratamiento: {r.get('treatment_suggested', 'N/A')}"
+        f" · Responsable: {r.get('risk_owner_suggested', 'N/A')}"
+        for i, r in enumerate(resultado, start=1)
+    ]
+    return f"{_riesgos(descripcion, mayuscula=True)} con {criterio} nivel de riesgo:\n\n" + "\n".join(lineas) + nota
+
+
+def responder_consulta(consulta, collection, valores_conocidos=None):
+    """Respuesta calculada localmente o None si la consulta debe ir al LLM"""
+    try:
+        intencion = clasificar(consulta, valores_conocidos)
+        if intencion is None:
+            return None
+        return formatear(intencion, ejecutar(intencion, collection))
+    except Exception as e:
+        print(f"Error en el enrutador de consultas: {e}")
+        return None
@@ -0,0 +1,131 @@
+"""
+Recursos compartidos del proceso: cliente de MongoDB y modelos de Gemini.
+
+Se crean de forma perezosa una sola vez por proceso (no en cada rerun de
+Streamlit) y toman las credenciales de `.env` (ver `.env.example`) o de
+`.streamlit/secrets.toml`. El pool de conexiones, los timeouts y los
+reintentos se configuran con variables de entorno.
+"""
+
+import os
+import threading
+import time
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+MODELO_GEMINI_DEFECTO = "gemini-flash-latest"
+
+_lock = threading.Lock()
+_mongo_client = None
+_gemini_configurado = False
+_modelos_gemini = {}
+
+
+def _leer_secreto(variable_entorno, seccion, clave):
+    """Busca primero en variables de entorno y luego en st.secrets"""
+    valor = os.getenv(variable_entorno)
+    if valor:
+        return valor
+    try:
+        import streamlit as st
+        return st.secrets[seccion][clave]
+    except Exception:
+        return None
+
+
+def _entero_env(nombre, defecto):
+    try:
+        return int(os.getenv(nombre, defecto))
+    except ValueError:
+        return defecto
+
+
+def _booleano_env(nombre, defecto):
+    return os.getenv(nombre, str(defecto)).strip().lower() in ("1", "true", "yes", "si", "sí")
+
+
+def configuracion_mongo():
+    """Opciones del pool de conexiones, timeouts y reintentos de MongoClient"""
+    return {
+        "maxPoolSize": _entero_env("MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _entero_env("MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _entero_env("MONGO_MAX_IDLE_TIME_MS", 300000),
+        "serverSelectionTimeoutMS": _entero_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "connectTimeoutMS": _entero_env("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _entero_env("MONGO_SOCKET_TIMEOUT_MS", 20000),
+        "retryWrites": _booleano_env("MONGO_RETRY_WRITES", True),
+        "retryReads": _booleano_env("MONGO_RETRY_READS", True),
+        "appname": "technova-riesgos"
+    }
+
+
+def obtener_mongo_client():
+    """Cliente MongoDB del proceso (el pool se reutiliza entre sesiones y reruns)"""
+    global _mongo_client
+    if _mongo_client is None:
+        with _lock:
+            if _mongo_client is None:
+                from pymongo import MongoClient
+
+                uri = _leer_secreto("MONGODB_URI", "MONGODB", "URI")
+                if not uri:
+                    raise RuntimeError(
+                        "No se encontró la URI de MongoDB: define MONGODB_URI en .env "
+                        "o [MONGODB] URI en .streamlit/secrets.toml"
+                    )
+                _mongo_client = MongoClient(uri, **configuracion_mongo())
+    return _mongo_client
+
+
+def configurar_gemini():
+    """Configura la API key de Gemini una sola vez por proceso"""
+    global _gemini_configurado
+    if not _gemini_configurado:
+        with _lock:
+            if not _gemini_configurado:
+                import google.generativeai as genai
+
+                api_key = _leer_secreto("GOOGLE_API_KEY", "GEMINI", "API_KEY")
+                if not api_key:
+                    raise RuntimeError(
+                        "No se encontró la API key de Gemini: define GOOGLE_API_KEY en .env "
+                        "o [GEMINI] API_KEY en .streamlit/secrets.toml"
+                    )
+                genai.configure(api_key=api_key)
+                _gemini_configurado = True
+
+
+def obtener_modelo_gemini(nombre=MODELO_GEMINI_DEFECTO):
+    """Instancia de GenerativeModel reutilizada por nombre de modelo"""
+    modelo = _modelos_gemini.get(nombre)
+    if modelo is None:
+        configurar_gemini()
+        import google.generativeai as genai
+
+        with _lock:
+            modelo = _modelos_gemini.setdefault(nombre, genai.GenerativeModel(nombre))
+    return modelo
+
+
+def verificar_salud():
+    """Estado de MongoDB (ping y latencia) y de la configuración de Gemini"""
+    estado = {}
+
+    inicio = time.perf_counter()
+    try:
+        obtener_mongo_client().admin.command("ping")
+        estado["mongo"] = {"ok": True, "latencia_ms": (time.perf_counter() - inicio) * 1000}
+    except Exception as e:
+        estado["mongo"] = {"ok": False, "error": str(e)}
+
+    try:
+        configurar_gemini()
+        estado["gemini"] = {"ok": True}
+    except Exception as e:
+        estado["gemini"] = {"ok": False, "error": str(e)}
+
+    return estado
@@ -0,0 +1,160 @@
+"""
+Motor de asignación de responsables para los riesgos procesados.
+
+Carga el personal una sola vez y precompila las reglas de rol y palabras clave
+en un índice invertido (regla / área -> candidatos). Cada fila solo evalúa las
+reglas una vez y puntúa a los candidatos que alguna regla activa, en lugar de
+recorrer a todo el personal con comparaciones de subcadenas.
+"""
+
+import zlib
+
+# (palabra clave del rol, palabras clave del activo / condición, puntaje)
+# El orden importa: para cada persona aplica la primera regla que se cumple
+REGLAS_ROL = [
+    ("dba", ("base", "datos"), 10),
+    ("seguridad", ("seguridad", "vpn", "correo"), 10),
+    ("devops", ("app", "ios", "web"), 10),
+    ("compliance", None, 10),  # Datos confidenciales
+    ("rrhh", ("rrhh",), 10),
+    ("ti", ("infra",), 8),  # También si el propietario contiene "ti"
+]
+PUNTAJE_AREA = 5
+PUNTAJE_SEGURIDAD_RIESGO_ALTO = 3
+CRITICIDADES_ALTAS = ("Alto", "Crítico")
+RESPONSABLE_DEFECTO = "Seguridad"
+
+# Responsables predeterminados cuando no hay personal en BD
+RESPONSABLES_PREDETERMINADOS = [
+    "J. Pérez", "M. Gómez", "L. Huaman", "A. Valdez", "R. Torres",
+    "S. Castillo", "D. Quispe", "M. Ramos", "V. León", "C. Morales",
+    "P. Ruiz", "E. Silva", "F. Mendoza", "G. Castro", "H. Vargas"
+]
+
+
+def _texto(valor):
+    return valor.lower() if isinstance(valor, str) else ""
+
+
+class ResponsibleMatcher:
+    """Asigna responsables a lotes de riesgos de forma determinista"""
+
+    def __init__(self, personal):
+        self.personal = list(personal)
+
+        # Perfiles únicos (reglas aplicables, área, especialista en seguridad):
+        # ante empate gana la primera persona de la lista, así que basta con
+        # conservar el primer índice de cada perfil
+        perfiles = {}
+        for idx, persona in enumerate(self.personal):
+            role = _texto(persona.get('role'))
+            area = _texto(persona.get('area'))
+            reglas = tuple(i for i, (clave_rol, _, _) in enumerate(REGLAS_ROL) if clave_rol in role)
+            perfiles.setdefault((reglas, area, 'seguridad' in role), idx)
+
+        self._perfiles = [(reglas, area, seguridad, idx) for (reglas, area, seguridad), idx in perfiles.items()]
+
+        # Índice invertido: regla -> perfiles, área -> perfiles
+        self._por_regla = {}
+        self._por_area = {}
+        self._seguridad = []
+        for p, (reglas, area, seguridad, _) in enumerate(self._perfiles):
+            for regla in reglas:
+                self._por_regla.setdefault(regla, []).append(p)
+            self._por_area.setdefault(area, []).append(p)
+            if seguridad:
+                self._seguridad.append(p)
+
+    @classmethod
+    def desde_coleccion(cls, collection):
+        """Carga el personal de MongoDB una sola vez"""
+        return cls(collection.find({}, {"_id": 0, "name": 1, "role": 1, "area": 1}))
+
+    def __len__(self):
+        return len(self.personal)
+
+    @staticmethod
+    def _reglas_activas(asset_lower, owner_lower, data_type):
+        activas = []
+        for i, (clave_rol, claves_activo, _) in enumerate(REGLAS_ROL):
+            if clave_rol == "compliance":
+                cumple = data_type == 'Confidencial'
+            else:
+                cumple = any(clave in asset_lower for clave in claves_activo)
+                if clave_rol == "ti":
+                    cumple = cumple or 'ti' in owner_lower
+            if cumple:
+                activas.append(i)
+        return activas
+
+    def _asignar_con_personal(self, asset_lower, owner_lower, data_type, criticidad):
+        activas = set(self._reglas_activas(asset_lower, owner_lower, data_type))
+        areas = {area for area in self._por_area if area in owner_lower or area in asset_lower}
+        riesgo_alto = criticidad in CRITICIDADES_ALTAS
+
+        candidatos = set()
+        for regla in activas:
+            candidatos.update(self._por_regla.get(regla, ()))
+        for area in areas:
+            candidatos.update(self._por_area[area])
+        if riesgo_alto:
+            candidatos.update(self._seguridad)
+
+        mejor_puntaje, mejor_idx = 0, None
+        for p in candidatos:
+            reglas, area, seguridad, idx = self._perfiles[p]
+            puntaje = next((REGLAS_ROL[r][2] for r in reglas if r in activas), 0)
+            if area in areas:
+                puntaje += PUNTAJE_AREA
+            if riesgo_alto and seguridad:
+                puntaje += PUNTAJE_SEGURIDAD_RIESGO_ALTO
+            if puntaje > mejor_puntaje or (puntaje == mejor_puntaje and mejor_idx is not None and idx < mejor_idx):
+                mejor_puntaje, mejor_idx = puntaje, idx
+
+        if mejor_idx is None or mejor_puntaje <= 0:
+            return RESPONSABLE_DEFECTO
+        return self.personal[mejor_idx].get('name', RESPONSABLE_DEFECTO)
+
+    @staticmethod
+    def _asignar_sin_personal(asset_lower, owner_lower):
+        # Asignar basado en propietario del activo
+        if 'dba' in owner_lower or 'base' in asset_lower:
+            return "M. Gómez"  # DBA
+        elif 'seguridad' in owner_lower or 'security' in asset_lower:
+            return "J. Pérez"  # Seguridad
+        elif 'devops' in owner_lower or 'dev' in asset_lower:
+            return "L. Huaman"  # DevOps
+        elif 'compliance' in owner_lower or 'kyc' in asset_lower:
+            return "C. Morales"  # Compliance
+        elif 'rrhh' in owner_lower:
+            return "P. Ruiz"  # RRHH
+        elif 'infra' in owner_lower or 'vpn' in asset_lower:
+            return "D. Quispe"  # Infraestructura
+        elif 'web' in asset_lower or 'portal' in asset_lower:
+            return "A. Valdez"  # Web
+        elif 'api' in asset_lower:
+            return "R. Torres"  # APIs
+        # Reparto estable según el activo (mismo activo -> mismo responsable)
+        semilla = zlib.crc32(f"{asset_lower}|{owner_lower}".encode("utf-8"))
+        return RESPONSABLES_PREDETERMINADOS[semilla % len(RESPONSABLES_PREDETERMINADOS)]
+
+    def asignar(self, asset, asset_owner, data_type, criticidad):
+        asset_lower, owner_lower = _texto(asset), _texto(asset_owner)
+        if self.personal:
+            return self._asignar_con_personal(asset_lower, owner_lower, data_type, criticidad)
+        return self._asignar_sin_personal(asset_lower, owner_lower)
+
+    def asignar_lote(self, filas):
+        """
+        Responsables para todas las filas (dicts con asset, asset_owner,
+        data_type y criticidad) en una sola pasada; las combinaciones repetidas
+        se resuelven una vez
+        """
+        memo = {}
+        responsables = []
+        for fila in filas:
+            clave = (fila.get('asset'), fila.get('asset_owner'), fila.get('data_type'), fila.get('criticidad'))
+            if clave not in memo:
+                memo[clave] = self.asignar(*clave)
+            responsables.append(memo[clave])
+        return responsables
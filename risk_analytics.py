@@ -0,0 +1,167 @@
+"""
+Análisis de patrones y recomendaciones algorítmicas sobre un marco columnar.
+
+`analyze_risk_patterns` y `generate_algorithmic_recommendations` recorrían
+`risk_records` (lista de dicts) seis o más veces: un bucle principal, listas
+de críticos y altos, tres comprensiones de cumplimiento y reordenamientos de
+los diccionarios de patrones. Aquí los registros se convierten una sola vez en
+un DataFrame tipado (categorías + NR float + una columna booleana por etiqueta
+de la taxonomía) y todos los agregados salen de groupby y máscaras NumPy. Las
+estructuras retornadas son las mismas que antes.
+"""
+
+import heapq
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from vuln_taxonomy import INDICADORES_CUMPLIMIENTO, TAXONOMIA, motor
+
+# Columna del marco -> (campo del registro, valor por defecto)
+COLUMNAS = {
+    "criticidad": ("criticidad", "Sin criticidad"),
+    "asset": ("asset", ""),
+    "owner": ("risk_owner_suggested", "Sin asignar"),
+    "treatment": ("treatment_suggested", "Sin tratamiento"),
+}
+CRITICIDADES_ALTAS = ["Alto", "Crítico"]
+UMBRAL_SOBRECARGA = 3  # Riesgos asignados a partir de los cuales se sugiere redistribuir
+
+
+def _etiquetas(serie):
+    """
+    Matriz booleana (filas x etiquetas de `motor.categorias`); el texto se
+    etiqueta solo una vez por valor distinto
+    """
+    codigos, unicos = pd.factorize(serie.fillna("").astype(str))
+    matriz = np.zeros((len(unicos), len(motor.categorias)), dtype=bool)
+    posicion = {categoria: i for i, categoria in enumerate(motor.categorias)}
+    for fila, texto in enumerate(unicos):
+        for categoria in motor.etiquetar(texto):
+            matriz[fila, posicion[categoria]] = True
+    return matriz[codigos] if len(unicos) else np.zeros((len(serie), len(motor.categorias)), dtype=bool)
+
+
+def marco_riesgos(risk_records):
+    """Registros (lista de dicts o DataFrame) -> DataFrame tipado para el análisis"""
+    origen = risk_records if isinstance(risk_records, pd.DataFrame) else pd.DataFrame.from_records(
+        list(risk_records or [])
+    )
+    n = len(origen)
+    marco = pd.DataFrame(index=pd.RangeIndex(n))
+    for columna, (campo, defecto) in COLUMNAS.items():
+        valores = origen[campo].to_numpy() if campo in origen.columns else np.full(n, defecto, dtype=object)
+        marco[columna] = pd.Series(valores, dtype=object).fillna(defecto).astype("category")
+    nr = origen["nivel_riesgo_NR"] if "nivel_riesgo_NR" in origen.columns else pd.Series(0, index=origen.index)
+    marco["nr"] = pd.to_numeric(nr, errors="coerce").fillna(0).astype("float64").to_numpy()
+
+    detalles = origen["risk_details"] if "risk_details" in origen.columns else pd.Series("", index=origen.index)
+    etiquetas = _etiquetas(detalles.reset_index(drop=True))
+    for i, categoria in enumerate(motor.categorias):
+        marco[categoria] = etiquetas[:, i]
+    return marco
+
+
+def _conteos(serie):
+    """Valor -> filas, en orden de primera aparición (como el bucle original)"""
+    return {k: int(v) for k, v in serie.groupby(serie, sort=False, observed=True).size().items()}
+
+
+def _vulnerabilidades(marco):
+    """
+    Lista de categorías por registro (en orden de registro y de taxonomía) y
+    conteos ordenados de mayor a menor; los empates, por primera aparición
+    """
+    nombres = list(TAXONOMIA)
+    matriz = marco[nombres].to_numpy(dtype=bool)
+    _, columnas = np.nonzero(matriz)
+    lista = [nombres[c] for c in columnas]
+
+    conteos = matriz.sum(axis=0)
+    if not len(marco):
+        return lista, {}
+    primera = np.where(conteos > 0, matriz.argmax(axis=0), len(marco))
+    presentes = np.flatnonzero(conteos)
+    orden = presentes[np.lexsort((presentes, primera[presentes], -conteos[presentes]))]
+    return lista, {nombres[c]: int(conteos[c]) for c in orden}
+
+
+def analizar_patrones(marco):
+    """Mismo diccionario que analyze_risk_patterns, calculado por columnas"""
+    altos = marco["criticidad"].isin(CRITICIDADES_ALTAS).to_numpy()
+    vulnerabilidades, conteo_vulnerabilidades = _vulnerabilidades(marco)
+
+    tratamientos = marco.groupby("treatment", sort=False, observed=True)["nr"].agg(["size", "mean"])
+    return {
+        'high_risk_assets': marco["asset"][altos].astype(object).tolist(),
+        'common_vulnerabilities': vulnerabilidades,
+        'owner_workload': _conteos(marco["owner"]),
+        'criticality_distribution': _conteos(marco["criticidad"]),
+        'treatment_effectiveness': {
+            tratamiento: {'count': int(fila["size"]), 'avg_risk': float(fila["mean"])}
+            for tratamiento, fila in tratamientos.iterrows()
+        },
+        'compliance_indicators': {
+            indicador: int(marco[indicador].sum()) for indicador in INDICADORES_CUMPLIMIENTO
+        },
+        'vulnerability_counts': conteo_vulnerabilidades
+    }
+
+
+def recomendaciones_algoritmicas(patterns):
+    """
+    Mismo diccionario que generate_algorithmic_recommendations; solo usa los
+    agregados de `patterns` (ya no vuelve a recorrer los registros)
+    """
+    recommendations = {
+        'immediate_actions': [],
+        'strategic_initiatives': [],
+        'resource_allocation': [],
+        'compliance_gaps': []
+    }
+
+    # Algoritmo 1: Priorización por criticidad y costo-beneficio
+    criticos = patterns['criticality_distribution'].get('Crítico', 0)
+    if criticos:
+        recommendations['immediate_actions'].append(
+            f"ATENCIÓN CRÍTICA: {criticos} riesgos críticos requieren acción inmediata en las próximas 7 días"
+        )
+
+    # Algoritmo 2: Optimización de recursos humanos
+    overloaded_owners = [
+        owner for owner, count in patterns['owner_workload'].items() if count >= UMBRAL_SOBRECARGA
+    ]
+    if overloaded_owners:
+        recommendations['resource_allocation'].append(
+            f"REDISTRIBUIR CARGA: {', '.join(overloaded_owners)} tienen 3+ riesgos asignados - considerar redistribución"
+        )
+
+    # Algoritmo 3: Detección de patrones de vulnerabilidad (conteos ya ordenados)
+    conteos = patterns.get('vulnerability_counts')
+    if conteos is None:
+        top_vulnerabilities = Counter(patterns['common_vulnerabilities']).most_common(3)
+    else:
+        top_vulnerabilities = list(conteos.items())[:3]
+    if top_vulnerabilities:
+        recommendations['strategic_initiatives'].append(
+            f"PATRONES IDENTIFICADOS: Principales vulnerabilidades - {', '.join([f'{v} ({c})' for v, c in top_vulnerabilities])}"
+        )
+
+    # Algoritmo 4: Análisis de tratamientos más efectivos
+    best_treatments = heapq.nsmallest(
+        2, patterns['treatment_effectiveness'].items(), key=lambda x: x[1]['avg_risk']
+    )
+    if best_treatments:
+        recommendations['strategic_initiatives'].append(
+            f"TRATAMIENTOS EFECTIVOS: {', '.join([t[0] for t in best_treatments])} muestran mejor reducción de riesgo"
+        )
+
+    # Algoritmo 5: Detección de brechas de cumplimiento
+    compliance_issues = [k for k, v in patterns['compliance_indicators'].items() if v > 0]
+    if compliance_issues:
+        recommendations['compliance_gaps'].append(
+            f"BRECHAS DE CUMPLIMIENTO: {len(compliance_issues)} áreas requieren atención - {', '.join(compliance_issues)}"
+        )
+
+    return recommendations
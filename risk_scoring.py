@@ -0,0 +1,117 @@
+"""
+Motor de puntuación vectorizado para evaluaciones de riesgo de TechNova S.A.
+
+Calcula todas las columnas derivadas de un DataFrame de riesgos de una sola vez
+(NumPy/pandas), con las mismas reglas que el procesamiento fila por fila:
+threat_score, NR, RR, criticidad, colores, tratamiento y fecha objetivo.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Umbrales (inclusivos) de las reglas de negocio
+UMBRALES_CRITICIDAD_NR = [25, 50, 75]
+NIVELES_CRITICIDAD = np.array(["Bajo", "Medio", "Alto", "Crítico"], dtype=object)
+DIAS_OBJETIVO = np.array([90, 30, 15, 7])  # Bajo, Medio, Alto, Crítico
+
+UMBRALES_COLOR_VALOR = [3, 5, 8]
+UMBRALES_COLOR_PUNTUACION = [5, 10, 15]
+COLORES = np.array(["verde", "amarillo", "naranja", "rojo"], dtype=object)
+
+EFICACIA_CONTROL = 60  # 60% eficacia simulada
+FACTOR_RIESGO_RESIDUAL = 0.6
+
+
+def _columna_texto(df, columna):
+    if columna not in df.columns:
+        return pd.Series("", index=df.index)
+    return df[columna]
+
+
+def _contiene(serie, patron):
+    """
+    str.contains (en minúsculas) evaluado solo sobre los valores distintos;
+    las planillas repiten mucho activos y tipos de dato
+    """
+    codigos, unicos = pd.factorize(serie.fillna("").astype(str))
+    coincide = pd.Index(unicos, dtype=object).str.lower().str.contains(patron, regex=True)
+    return np.asarray(coincide, dtype=bool)[codigos] if len(unicos) else np.zeros(len(serie), dtype=bool)
+
+
+def sugerir_tratamientos(criticidad, data_type, asset, risk_details):
+    """Versión vectorizada de suggest_treatment; recibe Series alineadas"""
+    # Transferir para activos de terceros o externos
+    externo = _contiene(asset, "third|3rd|externo|api|integracion")
+    # Evitar para riesgos de phishing o spear-phishing
+    phishing = _contiene(risk_details, "phishing|spear")
+    # Evitar para riesgos de disponibilidad o activos de red
+    disponibilidad = _contiene(data_type, "disponibilidad") | _contiene(asset, "vpn|red")
+
+    criticidad = np.asarray(criticidad, dtype=object)
+    alto = criticidad == "Alto"
+    medio = criticidad == "Medio"
+
+    return np.select(
+        [
+            criticidad == "Crítico",
+            alto & externo,
+            alto & phishing,
+            alto,
+            medio & disponibilidad,
+            medio
+        ],
+        ["Tratar", "Transferir", "Evitar", "Tratar", "Evitar", "Tratar"],
+        default="Aceptar"
+    )
+
+
+def calcular_puntajes(df, hoy=None, rng=None):
+    """
+    Retorna una copia de `df` con las columnas derivadas calculadas.
+    Requiere las columnas `probability` e `impact`; `asset`, `data_type` y
+    `risk_details` son opcionales para la sugerencia de tratamiento.
+    """
+    resultado = df.copy()
+    n = len(resultado)
+    hoy = hoy or datetime.now().date()
+    rng = rng or np.random.default_rng()
+
+    prob = resultado["probability"].astype(int).to_numpy()
+    imp = resultado["impact"].astype(int).to_numpy()
+
+    threat_score = prob + imp
+    nivel_riesgo_NR = prob * imp
+    valor_activo_VA = rng.integers(1, 6, size=n)
+
+    idx_criticidad = np.digitize(nivel_riesgo_NR, UMBRALES_CRITICIDAD_NR, right=True)
+    criticidad = NIVELES_CRITICIDAD[idx_criticidad]
+
+    # Solo hay un plazo por nivel: se formatean las 4 fechas y se indexan por fila
+    fechas_por_nivel = (pd.Timestamp(hoy) + pd.to_timedelta(DIAS_OBJETIVO, unit="D")).strftime("%d/%m/%Y")
+    fechas_objetivo = np.asarray(fechas_por_nivel, dtype=object)[idx_criticidad]
+
+    resultado["probability"] = prob
+    resultado["impact"] = imp
+    resultado["threat_score"] = threat_score
+    resultado["nivel_riesgo_NR"] = nivel_riesgo_NR
+    resultado["riesgo_residual_RR"] = nivel_riesgo_NR * FACTOR_RIESGO_RESIDUAL
+    resultado["eficacia_control_EC"] = EFICACIA_CONTROL
+    resultado["costo_mitigacion_CM"] = rng.integers(1, 11, size=n)
+    resultado["exposicion_E"] = rng.integers(1, 11, size=n)
+    resultado["valor_activo_VA"] = valor_activo_VA
+    resultado["prioridad_atencion_PA"] = nivel_riesgo_NR * valor_activo_VA
+    resultado["criticidad"] = criticidad
+    resultado["color_probabilidad"] = COLORES[np.digitize(prob, UMBRALES_COLOR_VALOR, right=True)]
+    resultado["color_impacto"] = COLORES[np.digitize(imp, UMBRALES_COLOR_VALOR, right=True)]
+    resultado["color_puntuacion"] = COLORES[np.digitize(threat_score, UMBRALES_COLOR_PUNTUACION, right=True)]
+    resultado["treatment_suggested"] = sugerir_tratamientos(
+        criticidad,
+        _columna_texto(resultado, "data_type"),
+        _columna_texto(resultado, "asset"),
+        _columna_texto(resultado, "risk_details")
+    )
+    resultado["target_remediation_date_proposed"] = fechas_objetivo
+
+    return resultado
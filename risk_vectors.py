@@ -0,0 +1,108 @@
+"""
+Almacén de vectores de los riesgos, separado de `risk_records`.
+
+Cada riesgo guardaba su embedding de 768 dimensiones como arreglo BSON de
+doubles dentro del propio documento (~6-15 KB por registro), que viajaba en
+todas las lecturas del dashboard. Aquí los vectores viven en su propia
+colección, con `_id` = `_id` del riesgo, codificados en binario float32
+(subtipo vector de BSON cuando pymongo lo soporta).
+
+Migración de los documentos existentes:
+
+    python risk_vectors.py --migrar [--lote 500]
+"""
+
+import argparse
+
+from pymongo import ReplaceOne
+
+from embeddings import DIMENSION_EMBEDDING, MODELO_EMBEDDING
+from quantization import codificar_vector, decodificar_vector
+
+NOMBRE_COLECCION = "risk_vectors"
+LOTE_MIGRACION = 500
+
+
+def _documento_vector(id_riesgo, vector, modelo):
+    return {
+        "_id": id_riesgo,
+        "embedding": codificar_vector(vector),
+        "dimension": len(vector),
+        "modelo": modelo
+    }
+
+
+def guardar_vectores_riesgo(collection, pares, modelo=MODELO_EMBEDDING):
+    """Guarda (id del riesgo, vector) en bloque; omite vectores de otra dimensión"""
+    operaciones = [
+        ReplaceOne({"_id": id_riesgo}, _documento_vector(id_riesgo, vector, modelo), upsert=True)
+        for id_riesgo, vector in pares
+        if vector is not None and len(vector) == DIMENSION_EMBEDDING
+    ]
+    if not operaciones:
+        return 0
+    collection.bulk_write(operaciones, ordered=False)
+    return len(operaciones)
+
+
+def obtener_vectores_riesgo(collection, ids):
+    """Vectores de los riesgos indicados como dict id -> np.ndarray"""
+    return {
+        doc["_id"]: decodificar_vector(doc["embedding"])
+        for doc in collection.find({"_id": {"$in": list(ids)}}, {"embedding": 1})
+    }
+
+
+def migrar_embeddings_inline(collection_riesgos, collection_vectores, lote=LOTE_MIGRACION):
+    """
+    Mueve los `embedding` inline de risk_records a la colección de vectores y
+    los elimina de los documentos originales. Es reanudable: solo procesa los
+    documentos que todavía tienen el campo. Los embeddings que no se pueden
+    migrar (no son una lista o tienen otra dimensión) se conservan inline.
+    """
+    migrados = 0
+    cursor = collection_riesgos.find({"embedding": {"$exists": True}}, {"embedding": 1}, batch_size=lote)
+    pendientes = []
+
+    def volcar():
+        # Mismo criterio que guardar_vectores_riesgo: solo se borra lo que se guardó
+        pares = [
+            (doc["_id"], doc["embedding"]) for doc in pendientes
+            if isinstance(doc.get("embedding"), list) and len(doc["embedding"]) == DIMENSION_EMBEDDING
+        ]
+        if not pares:
+            return 0
+        guardar_vectores_riesgo(collection_vectores, pares)
+        collection_riesgos.update_many(
+            {"_id": {"$in": [id_riesgo for id_riesgo, _ in pares]}},
+            {"$unset": {"embedding": ""}}
+        )
+        return len(pares)
+
+    for doc in cursor:
+        pendientes.append(doc)
+        if len(pendientes) >= lote:
+            migrados += volcar()
+            pendientes = []
+    if pendientes:
+        migrados += volcar()
+    return migrados
+
+
+if __name__ == "__main__":
+    from resources import obtener_mongo_client
+
+    parser = argparse.ArgumentParser(description="Vectores de riesgos fuera de risk_records")
+    parser.add_argument("--migrar", action="store_true", help="Mover los embeddings inline existentes")
+    parser.add_argument("--lote", type=int, default=LOTE_MIGRACION)
+    args = parser.parse_args()
+
+    client = obtener_mongo_client()
+    collection_riesgos = client["security_db"]["risk_records"]
+    collection_vectores = client["security_embeddings_db"][NOMBRE_COLECCION]
+
+    if args.migrar:
+        total = migrar_embeddings_inline(collection_riesgos, collection_vectores, args.lote)
+        print(f"✅ {total} documentos migrados a {collection_vectores.full_name}")
+    print(f"Vectores almacenados: {collection_vectores.estimated_document_count()}")
+    print(f"Riesgos con embedding inline: {collection_riesgos.count_documents({'embedding': {'$exists': True}})}")
@@ -0,0 +1,52 @@
+"""
+Utilidades para respuestas en streaming del asistente IA.
+
+`MedidorStream` envuelve el iterable de fragmentos de texto que devuelve Gemini
+(`generate_content(..., stream=True)`), lo reenvía tal cual a la interfaz y
+registra el tiempo hasta el primer token y la latencia total de la solicitud.
+"""
+
+import time
+
+
+class MedidorStream:
+    """Iterable de fragmentos que mide TTFT y latencia total"""
+
+    def __init__(self, fragmentos, inicio=None):
+        self._fragmentos = fragmentos
+        self.inicio = inicio if inicio is not None else time.perf_counter()
+        self.primer_token_s = None
+        self.total_s = None
+        self.partes = []
+
+    def __iter__(self):
+        try:
+            for fragmento in self._fragmentos:
+                if not fragmento:
+                    continue
+                if self.primer_token_s is None:
+                    self.primer_token_s = time.perf_counter() - self.inicio
+                self.partes.append(fragmento)
+                yield fragmento
+        finally:
+            self.total_s = time.perf_counter() - self.inicio
+
+    @property
+    def texto(self):
+        return "".join(self.partes)
+
+    def metricas(self):
+        return {
+            "primer_token_s": self.primer_token_s,
+            "total_s": self.total_s,
+            "fragmentos": len(self.partes),
+            "caracteres": sum(len(p) for p in self.partes)
+        }
+
+
+def texto_fragmento(chunk):
+    """Texto de un fragmento de Gemini ('' si viene sin partes, p. ej. bloqueado)"""
+    try:
+        return chunk.text or ""
+    except (ValueError, AttributeError):
+        return ""
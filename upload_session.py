@@ -0,0 +1,40 @@
+"""
+Sesión de procesamiento de una carga en "Análisis de Seguridad".
+
+Cualquier widget (incluido "Guardar en Base de Datos") provoca un rerun del
+script completo. La sesión guarda en `st.session_state` el Excel leído, los
+registros puntuados con su responsable y los chunks RAG ya embebidos, con la
+huella (SHA-256) del contenido cargado como clave: mientras la carga no cambie
+se reutiliza todo y al guardar no se vuelve a llamar a la API de embeddings.
+"""
+
+import hashlib
+
+from embeddings import promediar_embeddings
+
+
+def huella_carga(contenido):
+    """SHA-256 del contenido de la carga (bytes del archivo o del formulario)"""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+class SesionCarga:
+    """Resultados de procesar una carga, reutilizables entre reruns"""
+
+    def __init__(self, clave, registros, documentos_rag, trozos_por_registro, df_excel=None):
+        self.clave = clave
+        self.registros = registros
+        self.documentos_rag = documentos_rag
+        self.df_excel = df_excel
+        self.guardado = False
+
+        # Vector de cada registro = media de los embeddings de sus chunks
+        self.vectores_registros = []
+        inicio = 0
+        for n in trozos_por_registro:
+            chunks = documentos_rag[inicio:inicio + n]
+            self.vectores_registros.append(promediar_embeddings([d["embedding"] for d in chunks]))
+            inicio += n
+
+    def __len__(self):
+        return len(self.registros)
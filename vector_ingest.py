@@ -0,0 +1,199 @@
+"""
+Ingesta idempotente de chunks en `security_vectors`.
+
+Cada chunk se identifica por el SHA-256 de su texto (`content_hash`, con índice
+único). La escritura es un `bulk_write` desordenado de upserts con
+`$setOnInsert`: volver a guardar el mismo Excel o reintentar la inicialización
+del RAG tras un fallo parcial no crea vectores duplicados, solo inserta los
+chunks nuevos. Los chunks sin un embedding del modelo (p. ej. el respaldo por
+hash cuando falla Gemini, de otra dimensión) no se guardan: con `$setOnInsert`
+quedarían fijados para siempre, así que se omiten y un reintento los inserta.
+Un chunk de la base documental presente en varios archivos se guarda una vez
+con el conjunto `archivos` de los que lo contienen (`$addToSet`);
+`retirar_archivo` lo quita de ese conjunto y solo borra los chunks que quedan
+sin archivo. El embedding se guarda como binario float32 (ver
+quantization.py), unas 3 veces menos bytes que un arreglo BSON de doubles
+(~13 bytes por dimensión frente a 4).
+
+Compactación única de una colección con duplicados previos:
+
+    python vector_ingest.py --compactar
+
+Conversión de los embeddings guardados como arreglo al formato binario:
+
+    python vector_ingest.py --codificar
+"""
+
+import argparse
+import hashlib
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from embeddings import DIMENSION_EMBEDDING
+from quantization import BinaryVectorDtype, codificar_vector, decodificar_vector
+
+NOMBRE_INDICE_HASH = "content_hash_unico"
+CODIGO_CLAVE_DUPLICADA = 11000
+
+
+def hash_contenido(texto):
+    """Clave de contenido de un chunk (espacios normalizados)"""
+    return hashlib.sha256(" ".join((texto or "").split()).encode("utf-8")).hexdigest()
+
+
+def asegurar_indice_hash(collection):
+    """
+    Índice único sobre `content_hash`. Parcial para convivir con documentos
+    antiguos sin hash; si ya hay duplicados con hash hay que compactar antes.
+    """
+    try:
+        collection.create_index(
+            "content_hash",
+            name=NOMBRE_INDICE_HASH,
+            unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}}
+        )
+        return True
+    except OperationFailure as e:
+        print(f"No se pudo crear el índice único de content_hash (ejecuta vector_ingest.py --compactar): {e}")
+        return False
+
+
+def embedding_valido(doc):
+    """True si el documento trae un embedding del modelo (DIMENSION_EMBEDDING)"""
+    embedding = doc.get("embedding")
+    return embedding is not None and len(decodificar_vector(embedding)) == DIMENSION_EMBEDDING
+
+
+def upsert_documentos(collection, documentos):
+    """
+    Inserta solo los chunks cuyo contenido no existe todavía. Retorna la lista
+    de documentos realmente insertados (para sincronizar índices en memoria).
+    Omite los chunks cuyo embedding no tiene DIMENSION_EMBEDDING (mismo
+    criterio que risk_vectors.guardar_vectores_riesgo).
+    """
+    operaciones, candidatos, vistos = [], [], set()
+    omitidos = 0
+    for doc in documentos:
+        if not embedding_valido(doc):
+            omitidos += 1
+            continue
+        clave = doc.get("content_hash") or hash_contenido(doc.get("texto"))
+        if clave in vistos:
+            continue  # Duplicado dentro del mismo lote
+        vistos.add(clave)
+        doc["content_hash"] = clave
+        guardado = doc
+        if isinstance(doc.get("embedding"), (list, tuple)):
+            guardado = {**doc, "embedding": codificar_vector(doc["embedding"])}
+        actualizacion = {"$setOnInsert": guardado}
+        if doc.get("archivo"):
+            actualizacion["$addToSet"] = {"archivos": doc["archivo"]}
+        operaciones.append(UpdateOne({"content_hash": clave}, actualizacion, upsert=True))
+        candidatos.append(doc)
+
+    if omitidos:
+        print(f"{omitidos} chunks sin embedding válido no se guardaron (se insertarán al reintentar)")
+    if not operaciones:
+        return []
+
+    try:
+        resultado = collection.bulk_write(operaciones, ordered=False)
+        insertados = resultado.upserted_ids
+    except BulkWriteError as e:
+        # Upserts concurrentes del mismo contenido: el índice único rechaza el segundo
+        if any(err.get("code") != CODIGO_CLAVE_DUPLICADA for err in e.details.get("writeErrors", [])):
+            raise
+        insertados = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+
+    nuevos = []
+    for indice in sorted(insertados):
+        doc = candidatos[indice]
+        doc["_id"] = insertados[indice]
+        nuevos.append(doc)
+    return nuevos
+
+
+def retirar_archivo(collection, archivo):
+    """
+    Quita `archivo` de los chunks que lo contienen y elimina los que ya no
+    pertenecen a ningún archivo (los anteriores a `archivos`, por `archivo`).
+    Retorna los chunks eliminados.
+    """
+    collection.update_many({"archivos": archivo}, {"$pull": {"archivos": archivo}})
+    return collection.delete_many({
+        "$or": [
+            {"archivos": {"$size": 0}},
+            {"archivo": archivo, "archivos": {"$exists": False}}
+        ]
+    }).deleted_count
+
+
+def compactar_duplicados(collection, lote=1000):
+    """
+    Asigna `content_hash` a los documentos que no lo tienen y elimina los
+    duplicados por contenido (se conserva el más antiguo). Retorna
+    (documentos actualizados, duplicados eliminados).
+    """
+    conservados = {}
+    actualizaciones, eliminar = [], []
+    actualizados = eliminados = 0
+
+    cursor = collection.find({}, {"texto": 1, "content_hash": 1}).sort("_id", 1).batch_size(lote)
+    for doc in cursor:
+        clave = hash_contenido(doc.get("texto"))
+        if clave in conservados:
+            eliminar.append(doc["_id"])
+        else:
+            conservados[clave] = doc["_id"]
+            if doc.get("content_hash") != clave:
+                actualizaciones.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"content_hash": clave}}))
+
+        if len(eliminar) >= lote:
+            eliminados += collection.delete_many({"_id": {"$in": eliminar}}).deleted_count
+            eliminar = []
+
+    # Primero se eliminan duplicados para que el $set no choque con el índice único
+    if eliminar:
+        eliminados += collection.delete_many({"_id": {"$in": eliminar}}).deleted_count
+    for i in range(0, len(actualizaciones), lote):
+        actualizados += collection.bulk_write(actualizaciones[i:i + lote], ordered=False).modified_count
+
+    return actualizados, eliminados
+
+
+def codificar_embeddings(collection, lote=1000):
+    """Reescribe como binario float32 los embeddings guardados como arreglo. Retorna los convertidos"""
+    if BinaryVectorDtype is None:
+        print("Se requiere pymongo >= 4.10 para guardar vectores binarios; no se convirtió nada")
+        return 0
+    convertidos, operaciones = 0, []
+    cursor = collection.find({"embedding.0": {"$exists": True}}, {"embedding": 1}).batch_size(lote)
+    for doc in cursor:
+        operaciones.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": codificar_vector(doc["embedding"])}}))
+        if len(operaciones) >= lote:
+            convertidos += collection.bulk_write(operaciones, ordered=False).modified_count
+            operaciones = []
+    if operaciones:
+        convertidos += collection.bulk_write(operaciones, ordered=False).modified_count
+    return convertidos
+
+
+if __name__ == "__main__":
+    from resources import obtener_mongo_client
+
+    parser = argparse.ArgumentParser(description="Deduplicación por contenido de security_vectors")
+    parser.add_argument("--compactar", action="store_true", help="Eliminar duplicados y asignar content_hash")
+    parser.add_argument("--codificar", action="store_true", help="Convertir los embeddings en arreglo a binario float32")
+    args = parser.parse_args()
+
+    collection = obtener_mongo_client()["security_embeddings_db"]["security_vectors"]
+    antes = collection.estimated_document_count()
+    if args.compactar:
+        actualizados, eliminados = compactar_duplicados(collection)
+        print(f"✅ {eliminados} duplicados eliminados, {actualizados} documentos con content_hash asignado")
+    if args.codificar:
+        print(f"✅ {codificar_embeddings(collection)} embeddings convertidos a binario float32")
+    asegurar_indice_hash(collection)
+    print(f"Documentos: {antes} -> {collection.estimated_document_count()}")
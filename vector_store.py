@@ -0,0 +1,344 @@
+"""
+Capa de almacenamiento vectorial para el sistema RAG de TechNova S.A.
+
+Permite elegir entre la búsqueda vectorial de MongoDB Atlas (`$vectorSearch`)
+y un índice local en memoria que carga los embeddings de `security_vectors`
+en una matriz NumPy float32 contigua. Ambos backends devuelven la misma forma
+de resultado: una lista de diccionarios con `texto`, `score` y `fuente`.
+El índice local mantiene además un índice léxico BM25 sobre los mismos textos
+para la recuperación híbrida (ver bm25.py) y, opcionalmente, un índice IVF
+aproximado (ver ann_index.py) que se persiste en disco y se recarga con mmap.
+Con `cuantizacion` ("float16" o "int8", ver quantization.py) la primera fase
+de la búsqueda usa una copia cuantizada en memoria y los mejores candidatos se
+re-puntúan con los vectores float32 leídos de disco.
+Con el backend Atlas, `IndiceLexico` mantiene solo el BM25 (textos y fuentes,
+sin cargar los embeddings) para la misma recuperación híbrida.
+"""
+
+import copy
+import json
+import os
+import threading
+
+import numpy as np
+
+from ann_index import MIN_VECTORES_ANN, IndiceIVF
+from bm25 import IndiceBM25
+from quantization import FACTOR_RESCORE, MatrizCuantizada, decodificar_vector, modo_cuantizacion
+
+DIMENSION_EMBEDDING = 768  # Dimensión de Gemini text-embedding-004
+
+
+class AtlasVectorStore:
+    """Búsqueda vectorial delegada a MongoDB Atlas (requiere el índice `vector_index`)"""
+
+    def __init__(self, collection, index_name="vector_index", num_candidates=100):
+        self.collection = collection
+        self.index_name = index_name
+        self.num_candidates = num_candidates
+
+    def buscar(self, embedding, k=5):
+        pipeline = [
+            {
+                "$vectorSearch": {
+                    "index": self.index_name,
+                    "path": "embedding",
+                    "queryVector": list(embedding),
+                    "numCandidates": max(self.num_candidates, k),
+                    "limit": k
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "texto": 1,
+                    "score": {"$meta": "vectorSearchScore"},
+                    "fuente": 1
+                }
+            }
+        ]
+        try:
+            return list(self.collection.aggregate(pipeline))
+        except Exception:
+            # Sin índice vectorial (Mongo local o self-hosted)
+            return []
+
+
+class IndiceLexico:
+    """
+    Solo el índice BM25 de `security_vectors` (sin matriz de embeddings), para
+    la recuperación híbrida cuando la búsqueda vectorial la hace Atlas
+    """
+
+    def __init__(self):
+        self._textos = []
+        self._fuentes = []
+        self._lexico = IndiceBM25()
+        self._lock = threading.Lock()
+        self.ultimo_id = None
+
+    @classmethod
+    def desde_coleccion(cls, collection, batch_size=1000):
+        indice = cls()
+        indice.sincronizar(collection, batch_size)
+        return indice
+
+    def sincronizar(self, collection, batch_size=1000):
+        """Agrega los chunks con embedding posteriores al último _id visto (sin leer los vectores)"""
+        filtro = {"embedding": {"$exists": True}}
+        if self.ultimo_id is not None:
+            filtro["_id"] = {"$gt": self.ultimo_id}
+        cursor = collection.find(filtro, {"_id": 1, "texto": 1, "fuente": 1}).sort("_id", 1).batch_size(batch_size)
+        return self.agregar(cursor)
+
+    def __len__(self):
+        return len(self._textos)
+
+    def agregar(self, documentos):
+        """Indexa documentos (`texto`, `fuente`); el embedding, si viene, se ignora"""
+        textos, fuentes = [], []
+        for doc in documentos:
+            id_doc = doc.get("_id")
+            if id_doc is not None and (self.ultimo_id is None or id_doc > self.ultimo_id):
+                self.ultimo_id = id_doc
+            textos.append(doc.get("texto", ""))
+            fuentes.append(doc.get("fuente", ""))
+        with self._lock:
+            self._textos.extend(textos)
+            self._fuentes.extend(fuentes)
+            self._lexico.agregar(textos)
+        return len(textos)
+
+    def buscar_lexico(self, consulta, k=5):
+        """Top-k por BM25 (misma forma de resultado que LocalVectorStore.buscar_lexico)"""
+        with self._lock:
+            textos, fuentes = self._textos, self._fuentes
+            resultados = self._lexico.buscar(consulta, k)
+        return [{"texto": textos[i], "score": score, "fuente": fuentes[i]} for i, score in resultados]
+
+
+class LocalVectorStore:
+    """
+    Índice vectorial en proceso: producto punto sobre una matriz float32 contigua
+    y selección top-k con argpartition (sin ordenar toda la colección)
+    """
+
+    def __init__(self, dimension=DIMENSION_EMBEDDING, ann=None, cuantizacion=None):
+        self.dimension = dimension
+        self.ann = ann
+        self.cuantizacion = modo_cuantizacion(cuantizacion)
+        self._matriz = np.empty((0, dimension), dtype=np.float32)
+        # Con cuantización, _matriz es el memmap float32 de la copia completa en disco
+        self._cuantizada = MatrizCuantizada(dimension, self.cuantizacion) if self.cuantizacion else None
+        self._textos = []
+        self._fuentes = []
+        self._lexico = IndiceBM25()
+        self._lock = threading.Lock()
+        # Documentos de origen vistos (incluye los omitidos por dimensión) y
+        # mayor _id, para sincronizar incrementalmente con la colección
+        self.documentos_origen = 0
+        self.ultimo_id = None
+
+    @classmethod
+    def desde_coleccion(cls, collection, dimension=DIMENSION_EMBEDDING, batch_size=1000, ann=None, cuantizacion=None):
+        """Carga todos los embeddings de la colección en memoria"""
+        store = cls(dimension, ann=ann, cuantizacion=cuantizacion)
+        store.sincronizar(collection, batch_size)
+        return store
+
+    def sincronizar(self, collection, batch_size=1000):
+        """Agrega los documentos de la colección posteriores al último _id visto"""
+        filtro = {"embedding": {"$exists": True}}
+        if self.ultimo_id is not None:
+            filtro["_id"] = {"$gt": self.ultimo_id}
+        cursor = collection.find(
+            filtro,
+            {"_id": 1, "texto": 1, "fuente": 1, "embedding": 1}
+        ).sort("_id", 1).batch_size(batch_size)
+        return self.agregar(cursor)
+
+    def __len__(self):
+        return len(self._textos)
+
+    def agregar(self, documentos):
+        """Agrega documentos (`texto`, `fuente`, `embedding`) al índice"""
+        vectores, textos, fuentes = [], [], []
+        for doc in documentos:
+            self.documentos_origen += 1
+            id_doc = doc.get("_id")
+            if id_doc is not None and (self.ultimo_id is None or id_doc > self.ultimo_id):
+                self.ultimo_id = id_doc
+            embedding = doc.get("embedding")
+            if isinstance(embedding, bytes):  # Binary float32 (incluye bson.Binary)
+                embedding = decodificar_vector(embedding)
+            # Se ignoran vectores con otra dimensión (p. ej. el fallback por hash)
+            if embedding is None or len(embedding) != self.dimension:
+                continue
+            vectores.append(embedding)
+            textos.append(doc.get("texto", ""))
+            fuentes.append(doc.get("fuente", ""))
+
+        if not vectores:
+            return 0
+
+        nuevos = np.asarray(vectores, dtype=np.float32).reshape(-1, self.dimension)
+        with self._lock:
+            inicio = self._matriz.shape[0]
+            if self._cuantizada is not None:
+                self._cuantizada.agregar(nuevos)
+                self._matriz = self._cuantizada.completa
+            else:
+                self._matriz = np.ascontiguousarray(np.vstack([self._matriz, nuevos]))
+            self._textos.extend(textos)
+            self._fuentes.extend(fuentes)
+            self._lexico.agregar(textos)  # Mismas posiciones que la matriz
+            if self.ann is not None:
+                if self.ann.entrenado:
+                    self.ann.agregar(nuevos, inicio)
+                elif self._matriz.shape[0] >= MIN_VECTORES_ANN:
+                    self.ann.entrenar(self._matriz)
+        return len(textos)
+
+    def buscar_lexico(self, consulta, k=5):
+        """Top-k por BM25 sobre los textos del índice (score BM25 sin normalizar)"""
+        with self._lock:
+            textos, fuentes = self._textos, self._fuentes
+            resultados = self._lexico.buscar(consulta, k)
+        return [{"texto": textos[i], "score": score, "fuente": fuentes[i]} for i, score in resultados]
+
+    def buscar(self, embedding, k=5, n_probe=None):
+        """
+        Top-k por producto punto; score en la misma escala que Atlas ((1 + dot) / 2).
+        Con índice IVF entrenado solo se comparan los candidatos de las
+        `n_probe` listas más cercanas. Con cuantización, los k · FACTOR_RESCORE
+        mejores por score aproximado se re-puntúan en float32.
+        """
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        with self._lock:
+            matriz, textos, fuentes = self._matriz, self._textos, self._fuentes
+            cuantizada = self._cuantizada
+            candidatos = None
+            if self.ann is not None and self.ann.entrenado and query.shape[0] == self.dimension:
+                candidatos = self.ann.candidatos(query, n_probe)
+
+        n = matriz.shape[0]
+        if n == 0 or k <= 0 or query.shape[0] != self.dimension:
+            return []
+
+        if cuantizada is not None:
+            candidatos, scores = self._buscar_cuantizado(cuantizada, query, k, candidatos)
+        elif candidatos is None:
+            candidatos = np.arange(n)
+            scores = matriz @ query
+        else:
+            scores = matriz[candidatos] @ query
+        k = min(k, len(candidatos))
+        if k < len(candidatos):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidatos))
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {
+                "texto": textos[candidatos[i]],
+                "score": float((1.0 + scores[i]) / 2.0),
+                "fuente": fuentes[candidatos[i]]
+            }
+            for i in top
+        ]
+
+    @staticmethod
+    def _buscar_cuantizado(cuantizada, query, k, candidatos=None):
+        """Primera fase sobre los códigos cuantizados y re-puntuación exacta de los mejores"""
+        aproximados = cuantizada.puntuar(query, candidatos)
+        if candidatos is None:
+            candidatos = np.arange(len(aproximados))
+        m = min(len(candidatos), max(k, 1) * FACTOR_RESCORE)
+        if m < len(candidatos):
+            candidatos = candidatos[np.argpartition(-aproximados, m - 1)[:m]]
+        return cuantizada.reescalar(query, candidatos)
+
+    def guardar(self, directorio):
+        """Persiste matriz, textos y el índice IVF (si hay) en `directorio`"""
+        os.makedirs(directorio, exist_ok=True)
+        with self._lock:
+            np.save(os.path.join(directorio, "matriz.npy"), self._matriz)
+            metadatos = {
+                "dimension": self.dimension,
+                "textos": self._textos,
+                "fuentes": self._fuentes,
+                "documentos_origen": self.documentos_origen,
+                "ultimo_id": str(self.ultimo_id) if self.ultimo_id is not None else None
+            }
+            with open(os.path.join(directorio, "metadatos.json"), "w", encoding="utf-8") as f:
+                json.dump(metadatos, f, ensure_ascii=False)
+            if self.ann is not None and self.ann.entrenado:
+                self.ann.guardar(directorio)
+            else:
+                # Sin índice entrenado no deben quedar archivos IVF de una matriz anterior
+                IndiceIVF.borrar(directorio)
+
+    @classmethod
+    def cargar(cls, directorio, ann=None, cuantizacion=None):
+        """
+        Recarga un store persistido; la matriz se abre con mmap (solo lectura).
+        `ann` es la configuración del índice IVF y no se modifica: se usa el
+        persistido si corresponde a la matriz (mismas filas y dimensión) o, si
+        no, una copia que se entrena aquí
+        """
+        from bson import ObjectId
+
+        with open(os.path.join(directorio, "metadatos.json"), "r", encoding="utf-8") as f:
+            metadatos = json.load(f)
+        matriz = np.load(os.path.join(directorio, "matriz.npy"), mmap_mode="r")
+        if ann is not None:
+            persistido = None
+            if os.path.exists(os.path.join(directorio, "ivf.json")):
+                persistido = IndiceIVF.cargar(directorio, n_probe=ann.n_probe)
+                if (len(persistido) != matriz.shape[0] or persistido.dimension != metadatos["dimension"]
+                        or persistido.centroides.shape[1] != metadatos["dimension"]):
+                    print("Índice IVF persistido no corresponde a la matriz: se descarta")
+                    persistido = None
+            ann = persistido if persistido is not None else copy.deepcopy(ann)
+        store = cls(metadatos["dimension"], ann=ann, cuantizacion=cuantizacion)
+        store._matriz = matriz
+        if store._cuantizada is not None:
+            store._cuantizada = MatrizCuantizada.desde_matriz(store._matriz, store.cuantizacion)
+        store._textos = metadatos["textos"]
+        store._fuentes = metadatos["fuentes"]
+        store._lexico.agregar(store._textos)
+        store.documentos_origen = metadatos["documentos_origen"]
+        if metadatos["ultimo_id"]:
+            store.ultimo_id = ObjectId(metadatos["ultimo_id"])
+        if ann is not None and not ann.entrenado and len(store) >= MIN_VECTORES_ANN:
+            ann.entrenar(store._matriz)
+        return store
+
+
+def store_persistido(collection, directorio, ann=None, cuantizacion=None):
+    """
+    LocalVectorStore desde disco si sigue siendo coherente con la colección
+    (mismos documentos hasta el último _id guardado) más los documentos nuevos;
+    si no, se reconstruye desde MongoDB. Se vuelve a guardar si hubo cambios.
+    """
+    store = None
+    if os.path.exists(os.path.join(directorio, "metadatos.json")):
+        try:
+            store = LocalVectorStore.cargar(directorio, ann=ann, cuantizacion=cuantizacion)
+            filtro = {"embedding": {"$exists": True}}
+            if store.ultimo_id is not None:
+                filtro["_id"] = {"$lte": store.ultimo_id}
+            if collection.count_documents(filtro) != store.documentos_origen:
+                store = None  # Hubo borrados/compactación: reconstruir
+        except Exception as e:
+            print(f"No se pudo cargar el índice vectorial persistido: {e}")
+            store = None
+
+    if store is None:
+        # `ann` sigue sin entrenar: cargar() solo entrena copias
+        store = LocalVectorStore.desde_coleccion(collection, ann=ann, cuantizacion=cuantizacion)
+        store.guardar(directorio)
+    elif store.sincronizar(collection) > 0:
+        store.guardar(directorio)
+    return store
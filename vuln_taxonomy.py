@@ -0,0 +1,91 @@
+"""
+Taxonomía de vulnerabilidades para el análisis de patrones de riesgo.
+
+Todas las palabras clave (de las categorías de vulnerabilidad y de los
+indicadores de cumplimiento) se compilan en una única expresión regular
+insensible a mayúsculas y acentos ("autenticacion" reconoce también
+"Autenticación"). Una sola pasada por `risk_details` etiqueta todas las
+categorías presentes, no solo la primera, y el resultado lo comparten
+`analyze_risk_patterns` y `generate_algorithmic_recommendations`.
+
+Como las comprobaciones originales (`'mfa' in texto`), las coincidencias son
+por subcadena, no por palabra completa, y pueden solaparse ("mfacceso" es
+`mfa` y `acceso`): la expresión es una búsqueda anticipada `(?=(...))` que
+se prueba en cada posición del texto.
+"""
+
+import re
+import unicodedata
+
+# Categoría -> palabras clave (minúsculas y sin acentos)
+TAXONOMIA = {
+    "Phishing/Spear-phishing": ("phishing", "spear"),
+    "CSRF": ("csrf",),
+    "Autenticación débil": ("autenticacion", "mfa"),
+    "Falta de cifrado": ("cifrado", "encriptacion"),
+}
+INDICADORES_CUMPLIMIENTO = {
+    "mfa_missing": ("mfa",),
+    "encryption_missing": ("cifrado",),
+    "access_control": ("acceso",),
+}
+
+_VARIANTES = {"a": "aáàä", "e": "eéèë", "i": "iíìï", "o": "oóòö", "u": "uúùü"}
+
+
+def _sin_acentos(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def _patron(palabra):
+    """'autenticacion' -> '[aáàä]ut[eéèë]nt[iíìï]c...' (variantes acentuadas de cada vocal)"""
+    return "".join(f"[{_VARIANTES[c]}]" if c in _VARIANTES else re.escape(c) for c in palabra)
+
+
+class MotorTaxonomia:
+    """Etiquetador de textos por categorías con una sola expresión regular combinada"""
+
+    def __init__(self, categorias):
+        self.categorias = list(categorias)
+        self._etiquetas = {}  # palabra clave -> categorías
+        for categoria, palabras in categorias.items():
+            for palabra in palabras:
+                self._etiquetas.setdefault(palabra, []).append(categoria)
+        # Las palabras más largas primero; una palabra contenida en la coincidencia
+        # en la misma posición ("mfa" en "mfax...") se agrega por `_contenidas`
+        alternativas = sorted(self._etiquetas, key=len, reverse=True)
+        self._contenidas = {
+            palabra: {c for otra in alternativas if otra in palabra for c in self._etiquetas[otra]}
+            for palabra in alternativas
+        }
+        self._regex = re.compile(
+            "(?=(" + "|".join(_patron(p) for p in alternativas) + "))", re.IGNORECASE
+        )
+
+    def etiquetar(self, texto):
+        """Conjunto de categorías presentes en `texto`"""
+        encontradas = set()
+        for coincidencia in self._regex.finditer(texto or ""):
+            encontradas.update(self._contenidas[_sin_acentos(coincidencia.group(1).lower())])
+        return encontradas
+
+
+motor = MotorTaxonomia({**TAXONOMIA, **INDICADORES_CUMPLIMIENTO})
+
+
+def etiquetar_riesgos(risk_records, campo="risk_details"):
+    """Una pasada por los registros: lista con el conjunto de etiquetas de cada uno"""
+    return [motor.etiquetar(r.get(campo, "")) for r in risk_records]
+
+
+def vulnerabilidades(etiquetas):
+    """Categorías de vulnerabilidad (sin indicadores de cumplimiento), en orden"""
+    return [c for c in TAXONOMIA if c in etiquetas]
+
+
+def contar_indicadores(etiquetas_por_registro):
+    """Registros con cada indicador de cumplimiento"""
+    return {
+        indicador: sum(1 for etiquetas in etiquetas_por_registro if indicador in etiquetas)
+        for indicador in INDICADORES_CUMPLIMIENTO
+    }